@@ -1,9 +1,12 @@
+import os
 import uuid
 import streamlit as st
 from streamlit_option_menu import option_menu
 from routes.job import JobRoute
 from routes.analyse import AnalyseRoute
 from routes.curriculum import CurriculumRoute
+from service.llm_metrics import METRICS
+from database.backend import get_database
 
 from streamlit_agraph import agraph, Node, Edge, Config
 
@@ -81,10 +84,22 @@ def render_analyse():
         
         # --- REMOVER CHAMADA REDUNDANTE ---
         candidates = analyse_route.render_grid(option)  # Mantém apenas uma chamada
+        # Resumo da vaga lido dos agregados, sem percorrer as análises; vale para a página toda
+        stats = analyse_route.get_job_stats()
         
         if not candidates.empty:
-            # Gráfico de barras geral (corrigir referência 'bar' para 'st')
-            st.bar_chart(analyse_route._create_dataframe_to_analyse(), x="Nome", y="score", color="Nome")  # Corrigido
+            m1, m2, m3, m4 = st.columns(4)
+            m1.metric('Candidatos', stats['count'])
+            m2.metric('Média', f"{stats['mean'] or 0.0:.1f}")
+            m3.metric('Mediana', f"{stats['p50'] or 0.0:.1f}")
+            m4.metric('Percentil 90', f"{stats['p90'] or 0.0:.1f}")
+            c1, c2 = st.columns(2)
+            with c1:
+                st.bar_chart(pd.DataFrame(stats['top']), x='name', y='score')
+            with c2:
+                st.bar_chart(pd.Series(stats['histogram'], name='Candidatos'))
+            if stats['skills']:
+                st.bar_chart(pd.Series(stats['skills'], name='Candidatos'), horizontal=True)
             
             # ----------------------------------------------------------------------------
             #        GRAFO DE TODOS OS CANDIDATOS X SUAS HABILIDADES
@@ -100,6 +115,21 @@ def render_analyse():
         else:
             st.info("Nenhum candidato encontrado para esta vaga.")
 
+        deferred = analyse_route.get_deferred_resums()
+        if deferred:
+            with st.expander(f'Candidatos abaixo da nota mínima ({len(deferred)})'):
+                for resum in deferred:
+                    c1, c2 = st.columns([3, 1])
+                    c1.write(f"`{resum.get('score') or 0.0:.1f}` — {os.path.basename(resum.get('file'))}")
+                    if c2.button('Gerar resumo e opinião', key=f"deferred-{resum.get('id')}"):
+                        with st.spinner('Aguarde um momento...'):
+                            try:
+                                analyse_route.complete_deferred(resum)
+                            except Exception as err:
+                                st.error(f"Erro ao completar a análise: {err}")
+                            else:
+                                st.rerun()
+
         # Botão de limpar análise
         if st.button('Limpar Análise'):
             analyse_route.clean_analyse()
@@ -108,14 +138,14 @@ def render_analyse():
         # ----------------------------------------------------------------------------
         #        GRAFO DE TODOS OS CANDIDATOS X SUAS HABILIDADES
         # ----------------------------------------------------------------------------
-        if not analyse_route._create_dataframe_to_analyse().empty:
+        if stats['top']:
             st.subheader("Grafo de Candidatos x Competências")
+            st.caption(f"Os {len(stats['top'])} candidatos com as maiores notas")
 
+            # Top-K dos agregados: o grafo tem tamanho fixo qualquer que seja o número de análises
             candidate_skills_dict = {}
-            for idx, row in analyse_route._create_dataframe_to_analyse().iterrows():
-                name = row["Nome"]
-                skills = row["Habilidades"]  # Deve ser uma lista de strings
-                candidate_skills_dict[name] = skills
+            for candidate in stats['top']:
+                candidate_skills_dict[candidate['name']] = candidate.get('skills') or []
         
 
             # Crie listas de nós (Node) e arestas (Edge)
@@ -246,22 +276,25 @@ def render_analyse():
                                 </style>
                                 """, unsafe_allow_html=True)
 
-                            with st.expander('Resumo do Curriculum'):
-                                st.markdown(
-                                    f"""
-                                    <div class="scrollable-expander">
-                                    {candidate_resum.get('content')}
-                                    """,
-                                    unsafe_allow_html=True,
-                                )
-                            with st.expander('Análise do Candidato'):
-                                st.markdown(
-                                    f"""
-                                    <div class="scrollable-expander">
-                                    {candidate_resum.get('opnion')}
-                                    """,
-                                    unsafe_allow_html=True,
-                                )
+                            # Resumo e opinião ficam no blob store; só são lidos quando pedidos
+                            if st.toggle('Mostrar resumo e análise', key=f"texts-{row['resum_id']}"):
+                                texts = analyse_route.get_resum_by_id(row['resum_id'], with_text=True)
+                                with st.expander('Resumo do Curriculum', expanded=True):
+                                    st.markdown(
+                                        f"""
+                                        <div class="scrollable-expander">
+                                        {texts.get('content')}
+                                        """,
+                                        unsafe_allow_html=True,
+                                    )
+                                with st.expander('Análise do Candidato'):
+                                    st.markdown(
+                                        f"""
+                                        <div class="scrollable-expander">
+                                        {texts.get('opnion')}
+                                        """,
+                                        unsafe_allow_html=True,
+                                    )
 
                             # Botão de download do PDF
                             with open(candidate_resum.get('file'), 'rb') as file:
@@ -305,11 +338,44 @@ def render_jobs():
                 return
         job_route.remove_job_form(st, option)
 
+def render_metrics():
+    st.subheader('Chamadas ao LLM')
+    summary = pd.DataFrame(METRICS.summary())
+    if summary.empty:
+        st.info("Nenhuma chamada ao LLM registrada neste processo.")
+        return
+
+    # Ordenado pela latência total: o primeiro método é o que mais pesa no throughput
+    st.dataframe(summary, use_container_width=True)
+    with st.expander('Últimas chamadas'):
+        st.dataframe(pd.DataFrame(METRICS.records()[-200:]), use_container_width=True)
+    st.download_button(
+        label="Exportar métricas (Prometheus)",
+        data=METRICS.to_prometheus(),
+        file_name="llm.prom",
+        mime="text/plain",
+    )
+
+def render_database_stats():
+    database = get_database()
+    stats = database.storage_stats()
+    if not stats:
+        return
+
+    st.subheader('Banco de dados')
+    c1, c2, c3 = st.columns(3)
+    c1.metric('Journal', f"{stats.get('journal_bytes', 0) / 1024:.0f} KB")
+    c2.metric('Snapshot', f"{stats.get('snapshot_bytes', 0) / 1024:.0f} KB")
+    c3.metric('Replay na abertura', f"{stats.get('replay_seconds', 0.0):.3f}s", f"{stats.get('replayed_records', 0)} registros", delta_color='off')
+    if st.button('Compactar agora'):
+        stats = database.compact()
+        st.success(f"Journal compactado em {stats['last_compaction_seconds']:.3f}s")
+
 with st.sidebar:
     menu_selection = option_menu(
         "Recruter",
-        ["Vagas", "Curriculos", "Analise"], 
-        icons=['card-text', 'file-earmark-pdf', 'clipboard-data'], 
+        ["Vagas", "Curriculos", "Analise", "Metricas"], 
+        icons=['card-text', 'file-earmark-pdf', 'clipboard-data', 'speedometer2'], 
         menu_icon="cast", 
         default_index=0
     )
@@ -321,3 +387,6 @@ elif st.session_state.menu_selection == 'Vagas':
     render_jobs()
 elif st.session_state.menu_selection == 'Analise':
     render_analyse()
+elif st.session_state.menu_selection == 'Metricas':
+    render_metrics()
+    render_database_stats()
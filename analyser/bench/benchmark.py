@@ -0,0 +1,210 @@
+"""
+Benchmark ponta a ponta do processamento de currículos: gera N PDFs
+sintéticos, passa pelo CurriculumRoute e pelas factories contra o fake
+Ollama (ou um Ollama real com --host) e reporta CVs/minuto, p50/p95 por
+etapa, tempo de escrita no banco e pico de memória.
+
+    cd analyser && python -m bench.benchmark --cvs 50 --concurrency 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from bench.fake_ollama import FakeOllamaConfig, start_server
+
+
+SECTIONS = [
+    ('EXPERIÊNCIA PROFISSIONAL', [
+        '{year} até o momento - Empresa {index} Ltda',
+        'Cargo: Analista de Processos',
+        'Automação de relatórios em Python e SQL, redução de 30% no tempo de fechamento.',
+        'Implantação de dashboards em Power BI para a diretoria.',
+    ]),
+    ('HABILIDADES', ['Python, SQL, Power BI, Excel avançado', 'Lean Manufacturing, Kanban, Scrum']),
+    ('FORMAÇÃO', ['Bacharelado em Engenharia de Produção - Universidade {index}']),
+    ('IDIOMAS', ['Inglês avançado', 'Espanhol intermediário']),
+]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def generate_pdfs(folder, count, pages):
+    import fitz
+
+    folder.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for index in range(count):
+        doc = fitz.open()
+        for page_number in range(pages):
+            page = doc.new_page()
+            lines = [f'Candidato {index}', f'candidato{index}@email.com', f'Página {page_number + 1} de {pages}']
+            for title, content in SECTIONS:
+                lines.append(title)
+                lines.extend(line.format(index=index, year=2015 + index % 8) for line in content)
+            page.insert_text((50, 60), '\n'.join(lines), fontsize=10)
+        path = folder / f'cv_{index:04d}.pdf'
+        doc.save(path)
+        doc.close()
+        paths.append(path)
+    return paths
+
+
+def run(args):
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix='cv-bench-')).resolve()
+    workdir.mkdir(parents=True, exist_ok=True)
+    # O banco e o storage são relativos ao diretório atual: o benchmark nunca toca no db.json real
+    os.chdir(workdir)
+
+    server = None
+    if args.host:
+        os.environ['OLLAMA_HOST'] = args.host
+    else:
+        config = FakeOllamaConfig(
+            latency=args.latency,
+            tokens_per_second=args.tokens_per_second,
+            prefill_tokens_per_second=args.prefill_tokens_per_second,
+            malformed_rate=args.malformed_rate,
+        )
+        server, os.environ['OLLAMA_HOST'] = start_server(config)
+    os.environ['OLLAMA_MAX_CONCURRENCY'] = str(args.concurrency)
+    os.environ['LLM_CACHE_PATH'] = str(workdir / 'llm_cache.sqlite3')
+    os.environ['LLM_CACHE_DISABLED'] = 'false' if args.with_cache else 'true'
+    os.environ['LLM_METRICS_PATH'] = str(workdir / 'llm.prom')
+    os.environ.setdefault('LLM_RETRY_BASE_DELAY', '0.1')
+
+    from factories.job_factory import JobFactory
+    from routes.curriculum import CurriculumRoute
+    from service.file_service import FileService
+    from service.llm_metrics import METRICS
+
+    stage_times = defaultdict(list)
+
+    class TimedCurriculumRoute(CurriculumRoute):
+        async def process_single_cv_async(self, ai, content, path, job, vectors=None):
+            started = time.perf_counter()
+            result = await super().process_single_cv_async(ai, content, path, job, vectors)
+            stage_times['llm_per_cv'].append(time.perf_counter() - started)
+            return result
+
+    categories = ['Python', 'SQL', 'Power BI', 'Lean', 'Inglês']
+    job = JobFactory(
+        name='Analista de Dados (benchmark)',
+        main_activities='Automação de relatórios e dashboards.',
+        prerequisites='Python, SQL e Power BI.',
+        differentials='Lean Manufacturing e inglês avançado.',
+        sheet_name='benchmark',
+        competence=categories,
+        strategies=categories,
+        qualifications=categories,
+        score_qualification=[3.0] * len(categories),
+    ).create().model_dump()
+
+    pdfs = generate_pdfs(workdir / 'storage', args.cvs, args.pages)
+    route = TimedCurriculumRoute()
+    file_service = FileService()
+
+    started = time.perf_counter()
+    files_to_process = []
+    for path, extraction in file_service.extract_all(pdfs):
+        stage_times['extract'].append(extraction.seconds)
+        stage_started = time.perf_counter()
+        content = route.preprocess(extraction.text, path)
+        stage_times['preprocess'].append(time.perf_counter() - stage_started)
+        files_to_process.append((content, path))
+
+    if args.mode == 'single':
+        results = [route.process_single_cv(content, path, job) for content, path in files_to_process]
+    else:
+        results = asyncio.run(route.process_all(files_to_process, job))
+    results = [result for result in results if result]
+
+    stage_started = time.perf_counter()
+    resums, analyses, failures = route.build_records(results, [], job)
+    route.database.persist(resums=resums, analyses=analyses)
+    stage_times['db_write'].append(time.perf_counter() - stage_started)
+    persist_errors = len(failures)
+    for path, err in failures:
+        print(f"Falha ao gravar {path}: {err}")
+    elapsed = time.perf_counter() - started
+
+    for record in METRICS.records():
+        stage_times[f"llm:{record['method']}"].append(record['latency'])
+
+    report = {
+        'cvs': args.cvs,
+        'processed': len(results),
+        'persist_errors': persist_errors,
+        'mode': args.mode,
+        'concurrency': args.concurrency,
+        'elapsed_seconds': elapsed,
+        'cvs_per_minute': len(results) / elapsed * 60 if elapsed else 0.0,
+        'db_write_seconds': sum(stage_times['db_write']),
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'stages': {
+            stage: {
+                'count': len(values),
+                'p50': percentile(values, 50),
+                'p95': percentile(values, 95),
+                'mean': statistics.fmean(values),
+            }
+            for stage, values in sorted(stage_times.items()) if values
+        },
+        'workdir': str(workdir),
+    }
+    if server:
+        server.shutdown()
+    return report
+
+
+def print_report(report):
+    print(f"\nCVs processados: {report['processed']}/{report['cvs']} ({report['mode']}, concorrência {report['concurrency']}), "
+          f"{report['persist_errors']} falhas ao gravar")
+    print(f"Tempo total: {report['elapsed_seconds']:.2f}s  |  {report['cvs_per_minute']:.1f} CVs/minuto")
+    print(f"Escrita no banco: {report['db_write_seconds']:.3f}s  |  Pico de RSS: {report['peak_rss_mb']:.1f} MB\n")
+    print(f"{'etapa':<28}{'n':>6}{'p50 (s)':>12}{'p95 (s)':>12}{'média (s)':>12}")
+    for stage, values in report['stages'].items():
+        print(f"{stage:<28}{values['count']:>6}{values['p50']:>12.4f}{values['p95']:>12.4f}{values['mean']:>12.4f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark do pipeline de currículos.')
+    parser.add_argument('--cvs', type=int, default=20, help='quantidade de PDFs sintéticos')
+    parser.add_argument('--pages', type=int, default=2, help='páginas por PDF')
+    parser.add_argument('--mode', choices=['batch', 'single'], default='batch',
+                        help='batch usa process_all (um event loop); single chama process_single_cv em sequência')
+    parser.add_argument('--concurrency', type=int, default=4, help='requisições simultâneas ao Ollama')
+    parser.add_argument('--host', help='Ollama real; sem ele sobe o fake local')
+    parser.add_argument('--latency', type=float, default=FakeOllamaConfig.latency)
+    parser.add_argument('--tokens-per-second', type=float, default=FakeOllamaConfig.tokens_per_second)
+    parser.add_argument('--prefill-tokens-per-second', type=float, default=FakeOllamaConfig.prefill_tokens_per_second)
+    parser.add_argument('--malformed-rate', type=float, default=FakeOllamaConfig.malformed_rate)
+    parser.add_argument('--with-cache', action='store_true', help='mantém o cache de respostas ligado')
+    parser.add_argument('--workdir', help='diretório de trabalho (padrão: temporário)')
+    parser.add_argument('--json', dest='json_path', help='grava o relatório em JSON')
+    args = parser.parse_args(argv)
+    if args.json_path:
+        args.json_path = os.path.abspath(args.json_path)
+
+    report = run(args)
+    print_report(report)
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(report, indent=2), encoding='utf-8')
+    return report
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
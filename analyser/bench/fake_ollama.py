@@ -0,0 +1,215 @@
+"""
+Servidor local que imita o /api/generate do Ollama, para medir o pipeline
+sem GPU. Latência, velocidade de prefill/geração e taxa de respostas
+malformadas são configuráveis; as respostas são fixas por tipo de prompt.
+
+    python -m bench.fake_ollama --port 11434 --tokens-per-second 30 --malformed-rate 0.1
+"""
+import argparse
+import ast
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+CHARS_PER_TOKEN = 4
+
+
+@dataclass
+class FakeOllamaConfig:
+    latency: float = 0.05
+    tokens_per_second: float = 80.0
+    prefill_tokens_per_second: float = 800.0
+    malformed_rate: float = 0.0
+    opinion_tokens: int = 200
+    seed: int = 42
+
+
+SUMMARY = '''```markdown
+## Nome Completo
+Candidato Sintético
+
+## Experiência
+Analista de dados por 4 anos, com projetos de automação e BI.
+
+## Habilidades
+Python
+SQL
+Power BI
+
+## Educação
+Bacharelado em Engenharia de Produção
+
+## Idiomas
+Inglês avançado
+```'''
+
+MALFORMED = 'Desculpe, não consigo avaliar esse currículo com as informações fornecidas.'
+
+
+def _list_after(prompt, marker):
+    match = re.search(re.escape(marker) + r'[^\[]*(\[.*?\])', prompt, re.DOTALL)
+    if not match:
+        return []
+    try:
+        return list(ast.literal_eval(match.group(1)))
+    except (ValueError, SyntaxError):
+        return []
+
+
+def _scores(rng, count):
+    return [round(rng.uniform(1, 5), 1) for _ in range(count)]
+
+
+def canned_response(prompt, body, rng, config):
+    if body.get('format') == 'json' and '"candidatos"' in prompt:
+        candidates = len(re.findall(r'^### Candidato \d+', prompt, re.MULTILINE))
+        categories = len(_list_after(prompt, 'Qualificações avaliadas'))
+        return json.dumps({'candidatos': [_scores(rng, categories) for _ in range(candidates)]})
+    if body.get('format') == 'json':
+        return json.dumps({
+            'pontuacao_final': round(rng.uniform(2, 9.5), 1),
+            'competencias': _scores(rng, len(_list_after(prompt, '"competencias"'))),
+            'estrategias': _scores(rng, len(_list_after(prompt, '"estrategias"'))),
+            'qualificacoes': _scores(rng, len(_list_after(prompt, '"qualificacoes"'))),
+        })
+    if 'Pontuação Final' in prompt:
+        return f'Pontuação Final: {rng.uniform(2, 9.5):.1f}'
+    if 'Lista de 5 qualificações' in prompt:
+        count = len(_list_after(prompt, 'Lista de 5 qualificações')) or 5
+        return '\n'.join(str(score) for score in _scores(rng, count))
+    if 'Qualificações da vaga' in prompt:
+        count = len(_list_after(prompt, 'Qualificações da vaga')) or 5
+        return '\n'.join(str(score) for score in _scores(rng, count))
+    if 'Resumo de Currículo' in prompt:
+        return SUMMARY
+    if 'categorias separadas por nova linha' in prompt:
+        return '\n'.join(f'Categoria {index}' for index in range(1, 6))
+    words = ['O', 'candidato', 'demonstra', 'aderência', 'parcial', 'aos', 'requisitos', 'da', 'vaga.']
+    return ' '.join(words[index % len(words)] for index in range(config.opinion_tokens))
+
+
+def _apply_limits(text, options):
+    for stop in options.get('stop') or []:
+        if stop and stop in text.strip():
+            text = text.strip().split(stop)[0]
+    num_predict = options.get('num_predict')
+    if num_predict and num_predict > 0:
+        text = text[:num_predict * CHARS_PER_TOKEN]
+    return text
+
+
+def make_handler(config):
+    rng = random.Random(config.seed)
+    rng_lock = threading.Lock()
+
+    class FakeOllamaHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path == '/api/tags':
+                self._send_json({'models': [{'name': 'llama3'}]})
+                return
+            self._send_json({'status': 'ok'})
+
+        def do_POST(self):
+            if self.path != '/api/generate':
+                self.send_error(404)
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            prompt = body.get('prompt', '')
+            options = body.get('options') or {}
+            with rng_lock:
+                malformed = rng.random() < config.malformed_rate
+                text = MALFORMED if malformed else canned_response(prompt, body, rng, config)
+            text = _apply_limits(text, options)
+
+            prompt_tokens = max(1, len(prompt) // CHARS_PER_TOKEN)
+            completion_tokens = max(1, len(text) // CHARS_PER_TOKEN)
+            prefill = prompt_tokens / config.prefill_tokens_per_second
+            generation = completion_tokens / config.tokens_per_second
+            time.sleep(config.latency + prefill)
+
+            final = {
+                'model': body.get('model', 'llama3'),
+                'done': True,
+                'total_duration': int((config.latency + prefill + generation) * 1e9),
+                'load_duration': int(config.latency * 1e9),
+                'prompt_eval_count': prompt_tokens,
+                'prompt_eval_duration': int(prefill * 1e9),
+                'eval_count': completion_tokens,
+                'eval_duration': int(generation * 1e9),
+            }
+            if body.get('stream', True):
+                self._stream(text, final, generation)
+            else:
+                time.sleep(generation)
+                self._send_json({**final, 'response': text})
+
+        def _stream(self, text, final, generation):
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/x-ndjson')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            pieces = re.findall(r'\S+\s*|\s+', text) or ['']
+            delay = generation / len(pieces)
+            for piece in pieces:
+                time.sleep(delay)
+                self._chunk({'model': final['model'], 'response': piece, 'done': False})
+            self._chunk({**final, 'response': ''})
+            self.wfile.write(b'0\r\n\r\n')
+
+        def _chunk(self, data):
+            payload = (json.dumps(data) + '\n').encode('utf-8')
+            self.wfile.write(f'{len(payload):x}\r\n'.encode('ascii') + payload + b'\r\n')
+            self.wfile.flush()
+
+        def _send_json(self, data):
+            payload = json.dumps(data).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    return FakeOllamaHandler
+
+
+def start_server(config=None, host='127.0.0.1', port=0):
+    server = ThreadingHTTPServer((host, port), make_handler(config or FakeOllamaConfig()))
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f'http://{host}:{server.server_address[1]}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor falso do Ollama para benchmarks.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=11434)
+    parser.add_argument('--latency', type=float, default=FakeOllamaConfig.latency)
+    parser.add_argument('--tokens-per-second', type=float, default=FakeOllamaConfig.tokens_per_second)
+    parser.add_argument('--prefill-tokens-per-second', type=float, default=FakeOllamaConfig.prefill_tokens_per_second)
+    parser.add_argument('--malformed-rate', type=float, default=FakeOllamaConfig.malformed_rate)
+    args = parser.parse_args()
+
+    config = FakeOllamaConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        prefill_tokens_per_second=args.prefill_tokens_per_second,
+        malformed_rate=args.malformed_rate,
+    )
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(config))
+    print(f'Fake Ollama ouvindo em http://{args.host}:{args.port}')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,19 @@
-import fitz, uuid, re, time, os
+import uuid, re, time, os
 from service.sheets import AccessResume
-from database.tiny_db import AnalyserDatabase
+from database.backend import get_database
 from models.file import File
 from models.analysis import Analysis
 from models.resum import Resum
+from service.file_service import FileService
+from service.stored_files import file_hash
 from service.llama_client import LlamaClient
+from service.text_preprocessor import CVPreprocessor
 
 
-database = AnalyserDatabase()
+database = get_database()
 ai = LlamaClient()
+preprocessor = CVPreprocessor()
+file_service = FileService()
 
 
 # from tinydb import Query
@@ -18,11 +23,8 @@ ai = LlamaClient()
 
 
 def read_uploaded_file(file_path):
-    text = ""
-    with fitz.open(file_path) as doc:
-        for page in doc:
-            text += page.get_text()
-    return text
+    # Mesma extração da página de currículos, com os limites de páginas e tempo
+    return file_service.read(file_path)
 
 
 def extract_data_analysis(resum_cv, job_id, resum_id, score) -> Analysis:
@@ -94,8 +96,21 @@ for id in resums_ids:
     if not id.startswith("Faça") and not id == '104kU92P7igU9-ll1C0JVQcU5aKBz3yrT':                
         try:
             path = sheet.download_file(id)
-            content = read_uploaded_file(path)
-            resum = ai.resume_cv(content, job)
+            known = database.get_resums_by_file_hash(file_hash(path))
+            same_job = [resum for resum in known if resum.get('job_id') == job.get('id')]
+            if any(database.get_analysis_by_resum_id(resum.get('id')) for resum in same_job):
+                # Mesmo PDF já analisado para a vaga: só marca o arquivo do Drive como lido
+                database.persist(files=[File(file_id=id, job_id=job.get('id'))])
+                continue
+            processed = preprocessor.process(read_uploaded_file(path))
+            print(f"{path}: {processed.saved_tokens} tokens economizados")
+            content = processed.text
+            summarized = [resum for resum in known if resum.get('content') or resum.get('content_ref')]
+            if summarized:
+                # O resumo não depende da vaga: reaproveita o de outra vaga
+                resum = database.get_resum_by_id(summarized[-1].get('id'), with_text=True).get('content')
+            else:
+                resum = ai.resume_cv(content)
             opnion = ai.generate_opnion(content, job)
             score = ai.generate_score(resum, job)
             
@@ -103,17 +118,18 @@ for id in resums_ids:
             if not isinstance(score, float):
                 raise ValueError("Score inválido")
                 
-            resum_schema = Resum(id=str(uuid.uuid4()), job_id=job.get('id'), content=resum, file=str(path), opnion=opnion)
-            file = File(file_id=id, job_id=job.get('id')).model_dump()
-            analysis = extract_data_analysis(resum, resum_schema.job_id, resum_schema.id, score).model_dump()
+            resum_schema = Resum(id=str(uuid.uuid4()), job_id=job.get('id'), content=resum, file=str(path), opnion=opnion, file_hash=file_hash(path))
+            file = File(file_id=id, job_id=job.get('id'))
+            analysis = extract_data_analysis(resum, resum_schema.job_id, resum_schema.id, score)
             
-            # --- INSERIR DADOS NO BANCO ---
-            database.insert_resum(resum_schema)
-            database.analysis.insert(analysis)
-            database.files.insert(file)
+            # --- INSERIR DADOS NO BANCO (uma única escrita) ---
+            # Registros da vaga sem análise (fora da triagem ou adiados) dão lugar ao novo
+            database.persist(resums=[resum_schema], analyses=[analysis], files=[file],
+                             replaced=[resum.get('id') for resum in same_job])
             
         except Exception as err:
-            if os.path.isfile(path):
+            # O arquivo pode ser o mesmo PDF de um currículo de outra vaga
+            if os.path.isfile(path) and not database.get_resums_by_file_hash(file_hash(path)):
                 os.remove(path)
             print(f"Erro ao processar {id}: {str(err)}")  # Log detalhado
             continue  # Continua o loop mesmo com erro
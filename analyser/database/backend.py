@@ -0,0 +1,44 @@
+import os
+import threading
+from dotenv import load_dotenv
+from database.tiny_db import AnalyserDatabase
+from database.sqlite_db import SQLiteAnalyserDatabase
+from database.journal_storage import JournalStorage
+
+load_dotenv()
+
+# tinydb (db.json), sqlite (db.sqlite3) ou journal (db.journal + snapshot);
+# os dois últimos importam o db.json na primeira abertura
+DATABASE_BACKEND = os.getenv('DATABASE_BACKEND', 'tinydb').lower()
+DATABASE_PATH = os.getenv('DATABASE_PATH')
+
+
+def open_database(backend=None, path=None):
+    backend = backend or DATABASE_BACKEND
+    if backend == 'sqlite':
+        return SQLiteAnalyserDatabase(path or DATABASE_PATH or 'db.sqlite3')
+    if backend == 'journal':
+        return AnalyserDatabase(path or DATABASE_PATH or 'db.journal', storage=JournalStorage)
+    if backend != 'tinydb':
+        raise ValueError(f"DATABASE_BACKEND inválido: {backend}")
+    return AnalyserDatabase(path or DATABASE_PATH or 'db.json')
+
+
+_database = None
+_database_lock = threading.Lock()
+
+
+def get_database():
+    """
+    Banco compartilhado pelo processo: factories, rotas e cron usam a mesma
+    instância, aberta uma única vez, em vez de várias sobre o mesmo arquivo.
+    """
+    global _database
+    with _database_lock:
+        if _database is None:
+            _database = open_database()
+            # Registros gravados antes do blob store; depois da primeira vez não há o que mover
+            moved = _database.offload_resum_texts()
+            if moved:
+                print(f"{moved} currículos com textos movidos para o blob store")
+        return _database
@@ -0,0 +1,223 @@
+import os
+from models.job import Job
+from models.resum import Resum
+from models.analysis import Analysis
+from models.job_profile import JobProfile
+from database.job_stats import empty_stats, add_analyses, build_stats, summarize
+from database.blob_store import TEXT_FIELDS, offload_text_fields, load_text_fields
+from service.stored_files import extraction_cache_files
+
+
+# Campos com índice em cada tabela; as consultas do banco só filtram por eles
+INDEXED_FIELDS = {
+    'jobs': ('id', 'name'),
+    'resums': ('id', 'job_id', 'file_hash'),
+    'analysis': ('id', 'job_id', 'resum_id'),
+    'files': ('file_id', 'job_id'),
+    'job_profiles': ('hash',),
+    'job_stats': ('job_id',),
+}
+# Arquivos e blobs mais novos que isso podem pertencer a um processamento em andamento
+RECONCILE_MIN_AGE = float(os.getenv('RECONCILE_MIN_AGE', '3600'))
+
+
+def remove_stored_files(paths, shared=()):
+    """
+    Apaga os PDFs dos currículos removidos; devolve quantos existiam. Os de
+    `shared` continuam referenciados por outro currículo (mesmo conteúdo).
+    """
+    removed = 0
+    for path in set(filter(None, paths)) - set(shared):
+        if not os.path.isfile(path):
+            continue
+        # Texto extraído guardado ao lado do PDF; o nome sai do conteúdo, então vem antes de apagar
+        for extraction in extraction_cache_files(path):
+            extraction.unlink(missing_ok=True)
+        os.remove(path)
+        removed += 1
+    return removed
+
+
+class BaseAnalyserDatabase:
+    """
+    Regras do banco que não dependem do armazenamento. Os backends criam as
+    tabelas jobs, resums, analysis, files, job_profiles e job_stats (com
+    insert, insert_multiple, all, truncate e os *_by sobre INDEXED_FIELDS),
+    o `blobs` e implementam batch(), _remove_orphans() e
+    offload_resum_texts().
+    """
+
+    def batch(self):
+        raise NotImplementedError
+
+    def _remove_orphans(self):
+        """
+        Remove currículos e arquivos de vagas que não existem mais e análises
+        sem vaga ou sem currículo; devolve os currículos removidos e as contagens.
+        """
+        raise NotImplementedError
+
+    def offload_resum_texts(self):
+        raise NotImplementedError
+
+    def compact(self):
+        return None
+
+    def storage_stats(self):
+        return {}
+
+    def persist(self, resums=(), analyses=(), files=(), replaced=()):
+        """
+        Grava currículos, análises e arquivos processados em uma única escrita
+        atômica. `replaced` são ids de currículos sem análise (fora da triagem
+        ou adiados) que os novos substituem.
+        """
+        with self.batch():
+            for resum_id in replaced:
+                self.resums.remove_by('id', resum_id)
+            if resums:
+                self.resums.insert_multiple([offload_text_fields(resum.model_dump(), self.blobs) for resum in resums])
+            if analyses:
+                self.analysis.insert_multiple([analysis.model_dump() for analysis in analyses])
+                self._record_stats([analysis.model_dump() for analysis in analyses])
+            if files:
+                self.files.insert_multiple([file.model_dump() for file in files])
+
+    def delete_job_cascade(self, job_id, keep_job=False):
+        """
+        Remove a vaga com seus currículos, análises, registros de arquivo e
+        PDFs, em uma única escrita. keep_job mantém a vaga e limpa só o que
+        foi processado para ela. Os blobs podem ser compartilhados com outros
+        currículos e ficam para o reconcile().
+        """
+        with self.batch():
+            resums = self.resums.search_by('job_id', job_id)
+            removed = {
+                'resums': self.resums.remove_by('job_id', job_id),
+                'analysis': self.analysis.remove_by('job_id', job_id),
+                'files': self.files.remove_by('job_id', job_id),
+                'jobs': 0 if keep_job else self.jobs.remove_by('id', job_id),
+            }
+            self.job_stats.remove_by('job_id', job_id)
+            shared = self._shared_files(resums)
+        removed['pdfs'] = remove_stored_files([resum.get('file') for resum in resums], shared)
+        return removed
+
+    def _shared_files(self, removed_resums):
+        """Arquivos dos currículos removidos que outra vaga ainda usa."""
+        return {
+            resum.get('file') for resum in removed_resums
+            if resum.get('file_hash') and self.resums.search_by('file_hash', resum.get('file_hash'))
+        }
+
+    def reconcile(self, min_age=RECONCILE_MIN_AGE):
+        """
+        Remove o que ficou para trás de exclusões antigas: currículos, análises
+        e arquivos de vagas que não existem mais, análises sem currículo e
+        blobs que nenhum currículo referencia.
+        """
+        with self.batch():
+            leaked_resums, removed = self._remove_orphans()
+            self.rebuild_job_stats()
+            shared = self._shared_files(leaked_resums)
+            references = {
+                resum.get(f'{field}_ref') for resum in self.resums.all() for field in TEXT_FIELDS
+            }
+        removed['pdfs'] = remove_stored_files([resum.get('file') for resum in leaked_resums], shared)
+        removed['blobs'] = self.blobs.prune(references, min_age)
+        return removed
+
+    def _record_stats(self, analyses):
+        by_job = {}
+        for analysis in analyses:
+            by_job.setdefault(analysis.get('job_id'), []).append(analysis)
+        for job_id, rows in by_job.items():
+            current = self.job_stats.get_by('job_id', job_id) or empty_stats(job_id)
+            self.job_stats.upsert_by('job_id', job_id, add_analyses(current, rows))
+
+    def get_job_stats(self, job_id):
+        """
+        Resumo da vaga (quantidade, média, percentis, histograma, top-K e
+        habilidades) lido dos agregados, sem percorrer as análises.
+        """
+        stats = self.job_stats.get_by('job_id', job_id)
+        if stats is None:
+            # Análises gravadas antes dos agregados: monta uma vez e guarda
+            analyses = self.analysis.search_by('job_id', job_id)
+            stats = add_analyses(empty_stats(job_id), analyses)
+            if analyses:
+                self.job_stats.upsert_by('job_id', job_id, stats)
+        return summarize(stats)
+
+    def rebuild_job_stats(self):
+        with self.batch():
+            self.job_stats.truncate()
+            stats = build_stats(self.analysis.all())
+            if stats:
+                self.job_stats.insert_multiple(list(stats.values()))
+        return len(stats)
+
+    def insert_job(self, job: Job):
+        self.jobs.insert(job.model_dump())
+
+    def insert_analysis(self, analysis: Analysis):
+        with self.batch():
+            self.analysis.insert(analysis.model_dump())
+            self._record_stats([analysis.model_dump()])
+
+    def insert_resum(self, resum: Resum):
+        self.resums.insert(offload_text_fields(resum.model_dump(), self.blobs))
+
+    def insert_job_profile(self, profile: JobProfile):
+        self.job_profiles.upsert_by('hash', profile.hash, profile.model_dump())
+
+    def get_job_profile_by_hash(self, hash):
+        return self.job_profiles.get_by('hash', hash)
+
+    def get_job_by_name(self, name):
+        return self.jobs.get_by('name', name)
+
+    def get_last_file_by_job_id(self, job_id):
+        return self.files.get_by('job_id', job_id, last=True)
+
+    def get_all_sheet_names_in_jobs(self):
+        registros = self.jobs.all()
+        sheet_names = [registro['sheet_name'] for registro in registros]
+        return sheet_names
+
+    def get_resum_by_id(self, id, with_text=False):
+        """Sem with_text, content e opnion vêm vazios se estiverem no blob store."""
+        resum = self.resums.get_by('id', id)
+        return load_text_fields(resum, self.blobs) if resum and with_text else resum
+
+    def get_resums_by_file_hash(self, file_hash):
+        return self.resums.search_by('file_hash', file_hash)
+
+    def get_resums_by_job_id(self, job_id):
+        return self.resums.search_by('job_id', job_id)
+
+    def get_analysis_by_job_id(self, job_id):
+        return self.analysis.search_by('job_id', job_id)
+
+    def get_analysis_by_resum_id(self, resum_id):
+        return self.analysis.get_by('resum_id', resum_id)
+
+    def update_resum(self, new_data: Resum):
+        self.resums.update_by('id', new_data.id, offload_text_fields(new_data.model_dump(), self.blobs))
+
+    def update_job(self, new_data: Job):
+        self.jobs.update_by('id', new_data.id, new_data.model_dump())
+
+    def delete_job_by_id(self, id):
+        self.jobs.remove_by('id', id)
+
+    def delete_all_resums_by_job_id(self, job_id):
+        self.resums.remove_by('job_id', job_id)
+
+    def delete_all_analysis_by_job_id(self, job_id):
+        with self.batch():
+            self.analysis.remove_by('job_id', job_id)
+            self.job_stats.remove_by('job_id', job_id)
+
+    def delete_all_files_by_job_id(self, job_id):
+        self.files.remove_by('job_id', job_id)
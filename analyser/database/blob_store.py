@@ -0,0 +1,105 @@
+import hashlib
+import os
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+
+
+BLOB_STORE_PATH = os.getenv('BLOB_STORE_PATH', 'blobs')
+# Textos menores que isso continuam no próprio registro
+BLOB_MIN_BYTES = int(os.getenv('BLOB_MIN_BYTES', '256'))
+BLOB_CACHE_SIZE = int(os.getenv('BLOB_CACHE_SIZE', '64'))
+# Campos do Resum que vão para o blob store; o registro guarda <campo>_ref com o hash
+TEXT_FIELDS = ('content', 'opnion')
+
+
+class BlobStore:
+    """
+    Textos grandes comprimidos com zlib e endereçados pelo sha256 do texto:
+    o mesmo resumo gravado duas vezes ocupa um único arquivo.
+    """
+
+    def __init__(self, path=BLOB_STORE_PATH, cache_size=BLOB_CACHE_SIZE):
+        self.path = Path(path)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _blob_path(self, key):
+        return self.path / key[:2] / key[2:]
+
+    def put(self, text):
+        data = text.encode('utf-8')
+        key = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(key)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = path.with_name(f'{path.name}.{uuid.uuid4().hex}.tmp')
+            temporary.write_bytes(zlib.compress(data, 6))
+            os.replace(temporary, path)
+        return key
+
+    def get(self, key):
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+        text = zlib.decompress(self._blob_path(key).read_bytes()).decode('utf-8')
+        with self._lock:
+            self._cache[key] = text
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return text
+
+    def exists(self, key):
+        return self._blob_path(key).exists()
+
+    def keys(self):
+        if not self.path.exists():
+            return []
+        return [f'{folder.name}{blob.name}' for folder in self.path.iterdir() if folder.is_dir()
+                for blob in folder.iterdir() if not blob.name.endswith('.tmp')]
+
+    def prune(self, references, min_age=0):
+        """Apaga os blobs fora de references; os recentes podem ser de uma gravação em andamento."""
+        removed = 0
+        for key in self.keys():
+            path = self._blob_path(key)
+            if key not in references and time.time() - path.stat().st_mtime >= min_age:
+                self.delete(key)
+                removed += 1
+        return removed
+
+    def delete(self, key):
+        with self._lock:
+            self._cache.pop(key, None)
+        self._blob_path(key).unlink(missing_ok=True)
+
+
+def offload_text_fields(document, store, min_bytes=BLOB_MIN_BYTES):
+    """
+    Move os textos grandes do documento para o blob store. Campo vazio com
+    referência já gravada é mantido como está (registro lido sem os textos).
+    """
+    document = dict(document)
+    for field in TEXT_FIELDS:
+        text = document.get(field) or ''
+        if len(text.encode('utf-8')) >= min_bytes:
+            document[f'{field}_ref'] = store.put(text)
+            document[field] = ''
+        elif text and document.get(f'{field}_ref'):
+            # Texto curto novo: a referência antiga deixou de valer
+            document[f'{field}_ref'] = None
+    return document
+
+
+def load_text_fields(document, store):
+    document = dict(document)
+    for field in TEXT_FIELDS:
+        key = document.get(f'{field}_ref')
+        if key and not document.get(field):
+            document[field] = store.get(key)
+    return document
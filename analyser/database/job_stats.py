@@ -0,0 +1,96 @@
+import heapq
+import os
+from collections import defaultdict
+
+
+STATS_TOP_K = int(os.getenv('STATS_TOP_K', '10'))
+# A nota final vai de 0 a 10; o painel mostra uma faixa por ponto
+SCORE_MAX = 10.0
+HISTOGRAM_BINS = 10
+# Faixas guardadas para estimar os percentis: uma por valor de 0,0 a 10,0, o passo das notas
+SCORE_STEP = 0.1
+SCORE_BINS = round(SCORE_MAX / SCORE_STEP) + 1
+
+
+def empty_stats(job_id):
+    return {
+        'job_id': job_id, 'count': 0, 'total': 0.0, 'min': None, 'max': None,
+        'bins': [0] * SCORE_BINS, 'top': [], 'skills': {},
+    }
+
+
+def _bin(score):
+    # A folga evita que 5.7 caia na faixa de 5.6 por arredondamento
+    return min(max(int(score / SCORE_STEP + 1e-9), 0), SCORE_BINS - 1)
+
+
+def _add_score(stats, score):
+    stats['count'] += 1
+    stats['total'] += score
+    stats['min'] = score if stats['min'] is None else min(stats['min'], score)
+    stats['max'] = score if stats['max'] is None else max(stats['max'], score)
+    stats['bins'][_bin(score)] += 1
+
+
+def add_analyses(stats, analyses, top_k=STATS_TOP_K):
+    """
+    Acrescenta as análises aos agregados da vaga sem reler as anteriores.
+    O registro tem tamanho fixo: contagem, soma, mínimo, máximo, faixas de
+    nota para os percentis, top-K e contagem por habilidade.
+    """
+    stats = {**stats, 'bins': list(stats['bins']), 'skills': dict(stats['skills'])}
+    top = list(stats['top'])
+    for analysis in analyses:
+        score = float(analysis.get('score') or 0.0)
+        _add_score(stats, score)
+        top.append({
+            'score': score, 'name': analysis.get('name'), 'resum_id': analysis.get('resum_id'),
+            'skills': list(analysis.get('skills') or []),
+        })
+        for skill in set(analysis.get('skills') or []):
+            stats['skills'][skill] = stats['skills'].get(skill, 0) + 1
+    stats['top'] = heapq.nlargest(top_k, top, key=lambda candidate: candidate['score'])
+    return stats
+
+
+def build_stats(analyses):
+    """Agregados de todas as vagas a partir das análises; usado na reconstrução."""
+    by_job = defaultdict(list)
+    for analysis in analyses:
+        by_job[analysis.get('job_id')].append(analysis)
+    return {job_id: add_analyses(empty_stats(job_id), rows) for job_id, rows in by_job.items()}
+
+
+def percentile(stats, fraction):
+    """Valor da faixa que contém o percentil: exato para notas com uma casa decimal, senão erra menos de 0,1."""
+    if not stats['count']:
+        return None
+    rank = fraction * stats['count']
+    seen = 0
+    for index, count in enumerate(stats['bins']):
+        seen += count
+        if seen > rank:
+            return min(max(round(index * SCORE_STEP, 1), stats['min']), stats['max'])
+    return stats['max']
+
+
+def summarize(stats, skills=15):
+    """Resumo exibido no painel; não depende do número de análises da vaga."""
+    histogram = [0] * HISTOGRAM_BINS
+    for index, count in enumerate(stats['bins']):
+        # A nota 10,0 entra na última faixa do painel (9-10)
+        histogram[min(int(index * SCORE_STEP * HISTOGRAM_BINS / SCORE_MAX + 1e-9), HISTOGRAM_BINS - 1)] += count
+    return {
+        'count': stats['count'],
+        'mean': stats['total'] / stats['count'] if stats['count'] else None,
+        'min': stats['min'],
+        'p50': percentile(stats, 0.5),
+        'p90': percentile(stats, 0.9),
+        'max': stats['max'],
+        'histogram': {
+            f'{bin * SCORE_MAX / HISTOGRAM_BINS:g}-{(bin + 1) * SCORE_MAX / HISTOGRAM_BINS:g}': count
+            for bin, count in enumerate(histogram)
+        },
+        'top': stats['top'],
+        'skills': dict(heapq.nlargest(skills, stats['skills'].items(), key=lambda item: item[1])),
+    }
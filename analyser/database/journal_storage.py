@@ -0,0 +1,314 @@
+import argparse
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from tinydb.storages import Storage
+
+try:
+    import fcntl
+except ImportError:  # Windows: fica só o lock entre threads
+    fcntl = None
+
+
+JOURNAL_COMPACT_INTERVAL = float(os.getenv('JOURNAL_COMPACT_INTERVAL', '300'))
+JOURNAL_COMPACT_BYTES = int(float(os.getenv('JOURNAL_COMPACT_MB', '8')) * 1024 * 1024)
+
+
+class JournalStorage(Storage):
+    """
+    Storage do TinyDB em log: cada escrita acrescenta ao journal só os
+    documentos inseridos, alterados ou removidos, em vez de regravar o banco
+    inteiro. Na abertura o snapshot é carregado e o journal reaplicado por
+    cima; o compactador junta os dois em um snapshot novo, em segundo plano
+    ou sob demanda.
+
+    As alterações feitas por update() não mudam as chaves da tabela, então
+    a tabela avisa quais documentos mudaram por record_update() (IndexedTable
+    já faz isso). Registros acrescentados por outro processo (o cron) são
+    lidos do fim do journal na próxima leitura.
+
+    Entre processos, batch(), as gravações e a compactação seguram um flock
+    no journal; batch() relê o que o outro processo gravou antes de liberar
+    o bloco, então os doc_ids novos são calculados sobre o estado atual.
+    """
+
+    def __init__(self, path='db.journal', snapshot_path=None, import_path='db.json',
+                 compact_interval=JOURNAL_COMPACT_INTERVAL, compact_bytes=JOURNAL_COMPACT_BYTES, **kwargs):
+        self.path = path
+        self.snapshot_path = snapshot_path or f'{path}.snapshot'
+        self.compact_bytes = compact_bytes
+        self.lock = threading.RLock()
+        self.stats = {}
+        self._tables = {}
+        self._ids = {}
+        self._refs = {}
+        self._offset = 0
+        self._snapshot_stamp = None
+        self._version = 0
+        self._batch_depth = 0
+        self._flock_depth = 0
+        self._buffer = []
+        self._closed = threading.Event()
+
+        imported = self._import_json(import_path)
+        self._load()
+        self._handle = open(self.path, 'ab')
+        if imported:
+            self.compact()
+        if compact_interval:
+            threading.Thread(target=self._compactor, args=(compact_interval,), daemon=True).start()
+
+    def _import_json(self, import_path):
+        """Primeira abertura sem journal nem snapshot: parte do db.json existente."""
+        if os.path.exists(self.snapshot_path) or os.path.exists(self.path):
+            return False
+        if not import_path or not os.path.isfile(import_path):
+            return False
+        with open(import_path, encoding='utf-8') as file:
+            content = file.read().strip()
+        with open(self.snapshot_path, 'w', encoding='utf-8') as file:
+            file.write(content or '{}')
+        print(f"Journal iniciado a partir de {import_path}")
+        return True
+
+    @contextmanager
+    def _file_lock(self):
+        """flock exclusivo no journal, reentrante dentro do processo."""
+        with self.lock:
+            if fcntl is not None and not self._flock_depth:
+                fcntl.flock(self._handle.fileno(), fcntl.LOCK_EX)
+            self._flock_depth += 1
+            try:
+                yield
+            finally:
+                self._flock_depth -= 1
+                if fcntl is not None and not self._flock_depth:
+                    fcntl.flock(self._handle.fileno(), fcntl.LOCK_UN)
+
+    def _snapshot_file_stamp(self):
+        try:
+            stat = os.stat(self.snapshot_path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _load(self):
+        started = time.perf_counter()
+        self._tables = {}
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, encoding='utf-8') as file:
+                self._tables = json.load(file)
+        self._snapshot_stamp = self._snapshot_file_stamp()
+        self._offset = 0
+        records = self._replay(truncate_partial=True)
+        self._reset_ids()
+        self.stats = {
+            'replay_seconds': time.perf_counter() - started,
+            'replayed_records': records,
+            'journal_bytes': self._offset,
+            'snapshot_bytes': os.path.getsize(self.snapshot_path) if os.path.exists(self.snapshot_path) else 0,
+        }
+        print(
+            f"Journal: {records} registros reaplicados em {self.stats['replay_seconds']:.3f}s "
+            f"(journal {self.stats['journal_bytes'] / 1024:.0f} KB, snapshot {self.stats['snapshot_bytes'] / 1024:.0f} KB)"
+        )
+
+    def _reset_ids(self):
+        self._ids = {name: set(documents) for name, documents in self._tables.items()}
+        self._refs = {name: id(documents) for name, documents in self._tables.items()}
+
+    def _replay(self, end=None, truncate_partial=False):
+        if not os.path.exists(self.path):
+            return 0
+        records = 0
+        with open(self.path, 'rb') as file:
+            file.seek(self._offset)
+            while end is None or self._offset < end:
+                line = file.readline()
+                if not line:
+                    break
+                if not line.endswith(b'\n'):
+                    # Escrita interrompida no meio da linha: o registro nunca foi confirmado
+                    if truncate_partial:
+                        with open(self.path, 'r+b') as journal:
+                            journal.truncate(self._offset)
+                    break
+                self._apply(json.loads(line))
+                self._offset += len(line)
+                records += 1
+        return records
+
+    def _apply(self, record):
+        if record['op'] == 'drop':
+            self._tables.pop(record['t'], None)
+            return
+        table = self._tables.setdefault(record['t'], {})
+        if record['op'] == 'put':
+            table[record['id']] = record['doc']
+        else:
+            table.pop(record['id'], None)
+
+    def _sync(self):
+        """Aplica o que outro processo gravou desde a última leitura."""
+        if self._batch_depth:
+            return
+        size = os.fstat(self._handle.fileno()).st_size
+        if self._snapshot_file_stamp() != self._snapshot_stamp or size < self._offset:
+            self._load()
+            self._version += 1
+        elif size > self._offset:
+            self._replay()
+            self._reset_ids()
+            self._version += 1
+
+    def version(self):
+        with self.lock:
+            self._sync()
+            return self._version
+
+    def read(self):
+        with self.lock:
+            self._sync()
+            return self._tables
+
+    def write(self, data):
+        with self.lock:
+            records = []
+            for name, documents in data.items():
+                # O TinyDB só troca o dict da tabela que alterou; as outras são puladas
+                if self._refs.get(name) == id(documents) and name in self._ids:
+                    continue
+                previous = self._ids.get(name, set())
+                current = set(documents)
+                records.extend({'op': 'put', 't': name, 'id': doc_id, 'doc': documents[doc_id]} for doc_id in current - previous)
+                records.extend({'op': 'del', 't': name, 'id': doc_id} for doc_id in previous - current)
+                self._ids[name] = current
+                self._refs[name] = id(documents)
+            for name in set(self._ids) - set(data):
+                records.append({'op': 'drop', 't': name})
+                self._ids.pop(name)
+                self._refs.pop(name, None)
+            self._tables = data
+            self._append(records)
+
+    def record_update(self, table, doc_ids):
+        with self.lock:
+            documents = self._tables.get(table, {})
+            self._append([
+                {'op': 'put', 't': table, 'id': str(doc_id), 'doc': documents[str(doc_id)]}
+                for doc_id in doc_ids if str(doc_id) in documents
+            ])
+
+    def _append(self, records):
+        if not records:
+            return
+        if self._batch_depth:
+            self._buffer.extend(records)
+            return
+        payload = b''.join(json.dumps(record, ensure_ascii=False).encode('utf-8') + b'\n' for record in records)
+        with self._file_lock():
+            self._handle.write(payload)
+            self._handle.flush()
+            os.fsync(self._handle.fileno())
+            end = self._handle.tell()
+            if end - len(payload) > self._offset:
+                # Outro processo acrescentou registros antes dos nossos
+                self._replay(end=end - len(payload))
+                self._reset_ids()
+                self._version += 1
+            self._offset = end
+
+    @contextmanager
+    def batch(self):
+        with self.lock, self._file_lock():
+            if not self._batch_depth:
+                # Com o flock seguro, o que o cron acrescentou entra antes de o
+                # bloco calcular doc_ids; a versão nova faz as tabelas
+                # descartarem o próximo doc_id que tinham guardado
+                self._sync()
+            self._batch_depth += 1
+            try:
+                yield
+            except BaseException:
+                if self._batch_depth == 1:
+                    # Desfaz o que ficou só em memória relendo snapshot + journal
+                    self._buffer = []
+                    self._batch_depth = 0
+                    self._load()
+                    self._version += 1
+                    self._batch_depth = 1
+                raise
+            else:
+                if self._batch_depth == 1:
+                    records, self._buffer = self._buffer, []
+                    self._batch_depth = 0
+                    self._append(records)
+                    self._batch_depth = 1
+            finally:
+                self._batch_depth -= 1
+
+    def compact(self):
+        """
+        Grava o estado atual como snapshot e zera o journal. O flock impede
+        que o cron acrescente registros entre a leitura e o truncate.
+        """
+        with self.lock, self._file_lock():
+            if self._batch_depth:
+                return None
+            self._sync()
+            started = time.perf_counter()
+            journal_bytes = self._offset
+            temporary = f'{self.snapshot_path}.tmp'
+            with open(temporary, 'w', encoding='utf-8') as file:
+                json.dump(self._tables, file, ensure_ascii=False)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temporary, self.snapshot_path)
+            # Se cair aqui, o journal é reaplicado sobre o snapshot novo: put e del são idempotentes
+            os.ftruncate(self._handle.fileno(), 0)
+            self._offset = 0
+            self._snapshot_stamp = self._snapshot_file_stamp()
+            self.stats.update({
+                'journal_bytes': 0,
+                'snapshot_bytes': os.path.getsize(self.snapshot_path),
+                'last_compaction_seconds': time.perf_counter() - started,
+                'last_compaction_journal_bytes': journal_bytes,
+            })
+            return dict(self.stats)
+
+    def journal_size(self):
+        with self.lock:
+            return self._offset
+
+    def _compactor(self, interval):
+        while not self._closed.wait(interval):
+            try:
+                if self.journal_size() >= self.compact_bytes:
+                    self.compact()
+            except Exception as err:
+                print(f"Falha ao compactar o journal: {err}")
+
+    def close(self):
+        self._closed.set()
+        with self.lock:
+            if not self._handle.closed:
+                self._handle.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compacta o journal do banco.')
+    parser.add_argument('path', nargs='?', default=os.getenv('DATABASE_PATH') or 'db.journal')
+    args = parser.parse_args()
+
+    storage = JournalStorage(args.path, compact_interval=0)
+    before = storage.stats['journal_bytes']
+    stats = storage.compact()
+    storage.close()
+    print(f"Journal compactado: {before / 1024:.0f} KB -> snapshot de {stats['snapshot_bytes'] / 1024:.0f} KB "
+          f"em {stats['last_compaction_seconds']:.3f}s")
+
+
+if __name__ == '__main__':
+    main()
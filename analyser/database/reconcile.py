@@ -0,0 +1,45 @@
+import argparse
+import os
+import time
+from database.backend import open_database
+from database.base import RECONCILE_MIN_AGE, remove_stored_files
+from service.stored_files import extraction_cache_files
+
+
+def orphan_pdfs(database, storage_path, min_age):
+    """PDFs da pasta de upload que nenhum currículo referencia."""
+    resums = database.resums.all()
+    referenced = {os.path.abspath(resum.get('file')) for resum in resums if resum.get('file')}
+    # O texto extraído acompanha o PDF; o nome vem da mesma função usada para gravá-lo
+    referenced |= {os.path.abspath(cache) for path in referenced if os.path.isfile(path)
+                   for cache in extraction_cache_files(path)}
+    orphans = []
+    # storage/ guarda os PDFs por conteúdo em subpastas (storage/ab/<sha256>)
+    for folder, _, names in os.walk(storage_path):
+        for name in names:
+            path = os.path.join(folder, name)
+            if os.path.abspath(path) in referenced:
+                continue
+            if time.time() - os.path.getmtime(path) >= min_age:
+                orphans.append(path)
+    return orphans
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Remove registros, blobs e PDFs que sobraram de vagas excluídas.')
+    parser.add_argument('--backend', default=None)
+    parser.add_argument('--path', default=None)
+    parser.add_argument('--storage', default=None, help='pasta dos PDFs enviados; apaga os que não têm currículo')
+    parser.add_argument('--min-age', type=float, default=RECONCILE_MIN_AGE,
+                        help='segundos; arquivos mais novos podem ser de um processamento em andamento')
+    args = parser.parse_args()
+
+    database = open_database(args.backend, args.path)
+    removed = database.reconcile(args.min_age)
+    if args.storage and os.path.isdir(args.storage):
+        removed['pdfs'] += remove_stored_files(orphan_pdfs(database, args.storage, args.min_age))
+    print(', '.join(f'{name}: {count}' for name, count in removed.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from database.base import INDEXED_FIELDS, BaseAnalyserDatabase
+from database.blob_store import BLOB_STORE_PATH, BlobStore, offload_text_fields
+
+
+class SQLiteTable:
+    """
+    Tabela de documentos JSON com o subconjunto da API de tabela do TinyDB
+    usado fora do banco (insert, all, len). Os filtros por campo usam
+    índices de expressão sobre json_extract.
+    """
+
+    def __init__(self, connection, lock, name, transaction):
+        self._connection = connection
+        self._lock = lock
+        self.name = name
+        self._transaction = transaction
+
+    def _create(self):
+        self._connection.execute(
+            f'CREATE TABLE IF NOT EXISTS {self.name} (doc_id INTEGER PRIMARY KEY AUTOINCREMENT, data TEXT NOT NULL)'
+        )
+        for field in INDEXED_FIELDS.get(self.name, ()):
+            self._connection.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{self.name}_{field} ON {self.name} (json_extract(data, '$.{field}'))"
+            )
+
+    def insert(self, document):
+        with self._transaction():
+            cursor = self._connection.execute(
+                f'INSERT INTO {self.name} (data) VALUES (?)', (json.dumps(dict(document), ensure_ascii=False),)
+            )
+        return cursor.lastrowid
+
+    def insert_multiple(self, documents):
+        with self._transaction():
+            self._connection.executemany(
+                f'INSERT INTO {self.name} (data) VALUES (?)',
+                [(json.dumps(dict(document), ensure_ascii=False),) for document in documents],
+            )
+
+    def all(self):
+        with self._lock:
+            rows = self._connection.execute(f'SELECT data FROM {self.name} ORDER BY doc_id').fetchall()
+        return [json.loads(data) for data, in rows]
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute(f'SELECT COUNT(*) FROM {self.name}').fetchone()[0]
+
+    def search_by(self, field, value):
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT data FROM {self.name} WHERE json_extract(data, '$.{field}') = ? ORDER BY doc_id", (value,)
+            ).fetchall()
+        return [json.loads(data) for data, in rows]
+
+    def get_by(self, field, value, last=False):
+        order = 'DESC' if last else 'ASC'
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT data FROM {self.name} WHERE json_extract(data, '$.{field}') = ? ORDER BY doc_id {order} LIMIT 1",
+                (value,),
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def update_by(self, field, value, fields):
+        # Como o update do TinyDB, mescla os campos no documento
+        with self._transaction():
+            rows = self._connection.execute(
+                f"SELECT doc_id, data FROM {self.name} WHERE json_extract(data, '$.{field}') = ?", (value,)
+            ).fetchall()
+            self._connection.executemany(
+                f'UPDATE {self.name} SET data = ? WHERE doc_id = ?',
+                [(json.dumps({**json.loads(data), **fields}, ensure_ascii=False), doc_id) for doc_id, data in rows],
+            )
+        return len(rows)
+
+    def upsert_by(self, field, value, document):
+        with self._lock:
+            if not self.update_by(field, value, document):
+                self.insert(document)
+
+    def truncate(self):
+        with self._transaction():
+            self._connection.execute(f'DELETE FROM {self.name}')
+
+    def remove_by(self, field, value):
+        with self._transaction():
+            cursor = self._connection.execute(
+                f"DELETE FROM {self.name} WHERE json_extract(data, '$.{field}') = ?", (value,)
+            )
+        return cursor.rowcount
+
+
+class SQLiteAnalyserDatabase(BaseAnalyserDatabase):
+    """
+    Banco sobre SQLite: cada inserção grava só a linha nova, em vez de
+    reescrever o db.json inteiro. Na primeira abertura importa o db.json
+    existente, se houver.
+    """
+
+    def __init__(self, file_path='db.sqlite3', json_path='db.json', blob_path=BLOB_STORE_PATH) -> None:
+        self.file_path = file_path
+        self.blobs = BlobStore(blob_path)
+        self._lock = threading.RLock()
+        self._connection = sqlite3.connect(file_path, check_same_thread=False)
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._batch_depth = 0
+        self.jobs = SQLiteTable(self._connection, self._lock, 'jobs', self._transaction)
+        self.resums = SQLiteTable(self._connection, self._lock, 'resums', self._transaction)
+        self.analysis = SQLiteTable(self._connection, self._lock, 'analysis', self._transaction)
+        self.files = SQLiteTable(self._connection, self._lock, 'files', self._transaction)
+        self.job_profiles = SQLiteTable(self._connection, self._lock, 'job_profiles', self._transaction)
+        self.job_stats = SQLiteTable(self._connection, self._lock, 'job_stats', self._transaction)
+        with self._lock, self._connection:
+            self._connection.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+            for table in self._tables():
+                table._create()
+        self._migrate_json(json_path)
+
+    def _tables(self):
+        return [self.jobs, self.resums, self.analysis, self.files, self.job_profiles, self.job_stats]
+
+    def table(self, name):
+        return {table.name: table for table in self._tables()}[name]
+
+    def tables(self):
+        return {table.name for table in self._tables()}
+
+    @contextmanager
+    def _transaction(self):
+        # Dentro de batch() quem confirma ou desfaz é o bloco externo
+        with self._lock:
+            if self._batch_depth:
+                yield
+            else:
+                with self._connection:
+                    yield
+
+    @contextmanager
+    def batch(self):
+        """Uma transação para o bloco inteiro; se ele levantar exceção, nada é gravado."""
+        with self._lock:
+            self._batch_depth += 1
+            try:
+                if self._batch_depth == 1:
+                    with self._connection:
+                        yield self
+                else:
+                    yield self
+            finally:
+                self._batch_depth -= 1
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def _migrate_json(self, json_path):
+        """Importa o db.json do TinyDB uma única vez; o arquivo original é mantido."""
+        with self._lock:
+            migrated = self._connection.execute("SELECT value FROM meta WHERE key = 'migrated_from'").fetchone()
+            if migrated or not json_path or not os.path.isfile(json_path):
+                return
+            with open(json_path, encoding='utf-8') as file:
+                content = file.read().strip()
+            data = json.loads(content) if content else {}
+            with self._connection:
+                for table in self._tables():
+                    documents = data.get(table.name, {})
+                    # O TinyDB guarda {doc_id: documento}; a ordem dos doc_ids é a ordem de inserção
+                    rows = [documents[doc_id] for doc_id in sorted(documents, key=int)]
+                    self._connection.executemany(
+                        f'INSERT INTO {table.name} (data) VALUES (?)',
+                        [(json.dumps(row, ensure_ascii=False),) for row in rows],
+                    )
+                self._connection.execute(
+                    "INSERT INTO meta (key, value) VALUES ('migrated_from', ?)", (os.path.abspath(json_path),)
+                )
+            print(f"Banco migrado de {json_path} para {self.file_path}")
+
+    def _remove_orphans(self):
+        job_ids = "SELECT json_extract(data, '$.id') FROM jobs"
+        resum_ids = "SELECT json_extract(data, '$.id') FROM resums"
+        leaked_resums = [json.loads(data) for data, in self._connection.execute(
+            f"SELECT data FROM resums WHERE json_extract(data, '$.job_id') NOT IN ({job_ids})"
+        ).fetchall()]
+        return leaked_resums, {
+            'resums': self._connection.execute(
+                f"DELETE FROM resums WHERE json_extract(data, '$.job_id') NOT IN ({job_ids})"
+            ).rowcount,
+            'analysis': self._connection.execute(
+                f"DELETE FROM analysis WHERE json_extract(data, '$.job_id') NOT IN ({job_ids}) "
+                f"OR json_extract(data, '$.resum_id') NOT IN ({resum_ids})"
+            ).rowcount,
+            'files': self._connection.execute(
+                f"DELETE FROM files WHERE json_extract(data, '$.job_id') NOT IN ({job_ids})"
+            ).rowcount,
+        }
+
+    def offload_resum_texts(self):
+        with self._transaction():
+            rows = self._connection.execute('SELECT doc_id, data FROM resums').fetchall()
+            moved = []
+            for doc_id, data in rows:
+                resum = json.loads(data)
+                offloaded = offload_text_fields(resum, self.blobs)
+                if offloaded != resum:
+                    moved.append((json.dumps(offloaded, ensure_ascii=False), doc_id))
+            self._connection.executemany('UPDATE resums SET data = ? WHERE doc_id = ?', moved)
+        return len(moved)
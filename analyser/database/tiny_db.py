@@ -1,77 +1,329 @@
-from tinydb import TinyDB, Query
-from models.job import Job
-from models.resum import Resum
-from models.analysis import Analysis
+import os
+import threading
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from tinydb import TinyDB
+from tinydb.storages import JSONStorage
+from tinydb.table import Table
+from database.base import INDEXED_FIELDS, BaseAnalyserDatabase
+from database.blob_store import BLOB_STORE_PATH, BlobStore, offload_text_fields
 
 
-class AnalyserDatabase(TinyDB):
-    def __init__(self, file_path='db.json') -> None:
-        super().__init__(file_path)
+class WriteThroughJSONStorage(JSONStorage):
+    """
+    JSONStorage que mantém o último conteúdo lido/gravado em memória: as
+    leituras não reabrem o db.json e cada escrita vai direto para o disco.
+    Se o arquivo mudar por fora (o cron), o conteúdo é relido. O `lock` é
+    compartilhado pelas tabelas para que ler-modificar-gravar seja atômico
+    entre threads.
+
+    Dentro de `batch()` as escritas ficam só em memória e vão para o disco
+    de uma vez na saída; se o bloco falhar, nada é gravado.
+    """
+
+    def __init__(self, path, **kwargs):
+        super().__init__(path, **kwargs)
+        self.lock = threading.RLock()
+        self._cache = None
+        self._stamp = None
+        # Muda sempre que o conteúdo em memória é trocado sem passar por write()
+        self._version = 0
+        self._batch_depth = 0
+        self._pending = False
+
+    def _file_stamp(self):
+        stat = os.fstat(self._handle.fileno())
+        return stat.st_mtime_ns, stat.st_size
+
+    def _refresh(self):
+        if self._batch_depth:
+            return
+        stamp = self._file_stamp()
+        if self._stamp is None or stamp != self._stamp:
+            self._cache = super().read()
+            self._stamp = stamp
+            self._version += 1
+
+    def version(self):
+        with self.lock:
+            self._refresh()
+            return self._version
+
+    def read(self):
+        with self.lock:
+            self._refresh()
+            return self._cache
+
+    def write(self, data):
+        with self.lock:
+            if self._batch_depth:
+                self._cache = data
+                self._pending = True
+                return
+            self._flush(data)
+
+    def _flush(self, data):
+        try:
+            super().write(data)
+        except Exception:
+            # O TinyDB altera os documentos antes de gravar: descarta o que ficou em memória
+            self._stamp = None
+            raise
+        self._cache = data
+        self._stamp = self._file_stamp()
+
+    @contextmanager
+    def batch(self):
+        with self.lock:
+            # Dentro do bloco o arquivo não é relido: o que o cron gravou entra agora
+            self._refresh()
+            self._batch_depth += 1
+            try:
+                yield
+            except BaseException:
+                if self._batch_depth == 1:
+                    self._stamp = None
+                    self._pending = False
+                raise
+            else:
+                if self._batch_depth == 1 and self._pending:
+                    self._pending = False
+                    self._flush(self._cache)
+            finally:
+                self._batch_depth -= 1
+
+
+class IndexedTable(Table):
+    """
+    Tabela do TinyDB com índices hash em memória para os campos de
+    INDEXED_FIELDS. Os índices são montados na primeira consulta, mantidos
+    nas escritas feitas por esta tabela e remontados quando o storage troca
+    o conteúdo por fora delas (arquivo alterado pelo cron, batch desfeito).
+    """
+
+    def __init__(self, storage, name, cache_size=Table.default_query_cache_capacity, persist_empty=False):
+        super().__init__(storage, name, cache_size=cache_size, persist_empty=persist_empty)
+        self._documents = None
+        self._indexes = {}
+        self._stamp = None
+        self._lock = getattr(storage, 'lock', None) or threading.RLock()
+
+    @property
+    def indexed_fields(self):
+        return INDEXED_FIELDS.get(self.name, ())
+
+    def _storage_stamp(self):
+        version = getattr(self._storage, 'version', None)
+        return version() if version else None
+
+    def _ensure_index(self):
+        stamp = self._storage_stamp()
+        if self._documents is None or stamp != self._stamp:
+            self._rebuild_index(stamp)
+
+    def _rebuild_index(self, stamp):
+        # O cache de consultas e o próximo doc_id do TinyDB também ficam velhos
+        # quando o conteúdo muda por fora; sem isso o insert reaproveitaria o
+        # doc_id de uma linha gravada pelo cron e a sobrescreveria
+        self.clear_cache()
+        self._next_id = None
+        self._documents = {}
+        self._indexes = {field: defaultdict(set) for field in self.indexed_fields}
+        for doc_id, document in self._read_table().items():
+            self._index_add(self.document_id_class(doc_id), document)
+        self._stamp = stamp
+
+    def _index_add(self, doc_id, document):
+        self._documents[doc_id] = dict(document)
+        for field in self.indexed_fields:
+            value = document.get(field)
+            if isinstance(value, (str, int, float, bool)):
+                self._indexes[field][value].add(doc_id)
+
+    def _index_discard(self, doc_id):
+        document = self._documents.pop(doc_id, None)
+        if document is None:
+            return
+        for field in self.indexed_fields:
+            value = document.get(field)
+            if not isinstance(value, (str, int, float, bool)):
+                continue
+            ids = self._indexes[field].get(value)
+            if ids:
+                ids.discard(doc_id)
+                if not ids:
+                    del self._indexes[field][value]
+
+    def _reindex(self, doc_ids):
+        table = self._read_table()
+        for doc_id in doc_ids:
+            self._index_discard(doc_id)
+            document = table.get(str(doc_id))
+            if document is not None:
+                self._index_add(doc_id, document)
+
+    def search_by(self, field, value):
+        with self._lock:
+            self._ensure_index()
+            return [
+                self.document_class(dict(self._documents[doc_id]), doc_id)
+                for doc_id in sorted(self._indexes[field].get(value, ()))
+            ]
+
+    def get_by(self, field, value, last=False):
+        documents = self.search_by(field, value)
+        if not documents:
+            return None
+        return documents[-1] if last else documents[0]
+
+    def remove_by(self, field, value):
+        with self._lock:
+            doc_ids = [document.doc_id for document in self.search_by(field, value)]
+            return len(self.remove(doc_ids=doc_ids)) if doc_ids else 0
+
+    def update_by(self, field, value, fields):
+        with self._lock:
+            doc_ids = [document.doc_id for document in self.search_by(field, value)]
+            return len(self.update(fields, doc_ids=doc_ids)) if doc_ids else 0
+
+    def upsert_by(self, field, value, document):
+        with self._lock:
+            current = self.get_by(field, value)
+            if current is None:
+                self.insert(document)
+            else:
+                self.update(document, doc_ids=[current.doc_id])
+
+    def _read_table(self):
+        with self._lock:
+            return super()._read_table()
+
+    def _update_table(self, updater):
+        with self._lock:
+            super()._update_table(updater)
+
+    def insert(self, document):
+        with self._lock, self._storage_batch():
+            self._ensure_index()
+            doc_id = super().insert(document)
+            self._index_add(doc_id, document)
+            self._stamp = self._storage_stamp()
+            return doc_id
+
+    def insert_multiple(self, documents):
+        with self._lock, self._storage_batch():
+            self._ensure_index()
+            documents = list(documents)
+            doc_ids = super().insert_multiple(documents)
+            for doc_id, document in zip(doc_ids, documents):
+                self._index_add(doc_id, document)
+            self._stamp = self._storage_stamp()
+            return doc_ids
+
+    def _record_update(self, doc_ids):
+        # O update altera os documentos no lugar; storages em log precisam saber quais mudaram
+        record = getattr(self._storage, 'record_update', None)
+        if record:
+            record(self.name, doc_ids)
+
+    def _storage_batch(self):
+        batch = getattr(self._storage, 'batch', None)
+        return batch() if batch else nullcontext()
+
+    def update(self, fields, cond=None, doc_ids=None):
+        with self._lock, self._storage_batch():
+            self._ensure_index()
+            updated = super().update(fields, cond, doc_ids)
+            self._record_update(updated)
+            self._reindex(updated)
+            self._stamp = self._storage_stamp()
+            return updated
+
+    def update_multiple(self, updates):
+        with self._lock, self._storage_batch():
+            self._ensure_index()
+            updated = super().update_multiple(updates)
+            self._record_update(updated)
+            self._reindex(updated)
+            self._stamp = self._storage_stamp()
+            return updated
+
+    def upsert(self, document, cond=None):
+        with self._lock, self._storage_batch():
+            return super().upsert(document, cond)
+
+    def remove(self, cond=None, doc_ids=None):
+        with self._lock, self._storage_batch():
+            self._ensure_index()
+            removed = super().remove(cond, doc_ids)
+            for doc_id in removed:
+                self._index_discard(doc_id)
+            self._stamp = self._storage_stamp()
+            return removed
+
+    def truncate(self):
+        with self._lock, self._storage_batch():
+            super().truncate()
+            self._documents = None
+
+
+class AnalyserDatabase(BaseAnalyserDatabase, TinyDB):
+    table_class = IndexedTable
+
+    def __init__(self, file_path='db.json', storage=WriteThroughJSONStorage, blob_path=BLOB_STORE_PATH) -> None:
+        super().__init__(file_path, storage=storage)
+        # content e opnion dos currículos ficam comprimidos fora da tabela
+        self.blobs = BlobStore(blob_path)
         self.jobs = self.table('jobs')
         self.resums = self.table('resums')
         self.analysis = self.table('analysis')
         self.files = self.table('files')
+        self.job_profiles = self.table('job_profiles')
+        # Agregados por vaga mantidos a cada inserção/exclusão de análise
+        self.job_stats = self.table('job_stats')
+
+    @contextmanager
+    def batch(self):
+        """
+        Agrupa as escritas do bloco em uma única gravação do db.json; se o
+        bloco levantar exceção, nenhuma delas é gravada.
+        """
+        with self.storage.batch():
+            yield self
+
+    def compact(self):
+        """Compacta o storage em log, se for o caso; devolve as estatísticas ou None."""
+        compact = getattr(self.storage, 'compact', None)
+        return compact() if compact else None
+
+    def storage_stats(self):
+        return dict(getattr(self.storage, 'stats', {}))
+
+    def _remove_orphans(self):
+        job_ids = {job.get('id') for job in self.jobs.all()}
+        leaked_resums = [resum for resum in self.resums.all() if resum.get('job_id') not in job_ids]
+        self.resums.remove(doc_ids=[resum.doc_id for resum in leaked_resums])
+        resum_ids = {resum.get('id') for resum in self.resums.all()}
+        leaked_analysis = [
+            analysis.doc_id for analysis in self.analysis.all()
+            if analysis.get('job_id') not in job_ids or analysis.get('resum_id') not in resum_ids
+        ]
+        self.analysis.remove(doc_ids=leaked_analysis)
+        leaked_files = [file.doc_id for file in self.files.all() if file.get('job_id') not in job_ids]
+        self.files.remove(doc_ids=leaked_files)
+        return leaked_resums, {
+            'resums': len(leaked_resums),
+            'analysis': len(leaked_analysis),
+            'files': len(leaked_files),
+        }
 
-    def insert_job(self, job: Job):
-        self.jobs.insert(job.model_dump())
-    
-    def insert_analysis(self, analysis: Analysis):
-        self.analysis.insert(analysis.model_dump())
-
-    def insert_resum(self, resum: Resum):
-        self.resums.insert(resum.model_dump())
-
-    def get_job_by_name(self, name):
-        job = Query()
-        result = self.jobs.search(job.name == name)
-        return result[0] if result else None
-
-    def get_last_file_by_job_id(self, job_id):
-        file = Query()
-        files_id = self.files.search(file.job_id == job_id)
-        return files_id[-1] if files_id else None
-
-    def get_all_sheet_names_in_jobs(self):
-        registros = self.jobs.all()
-        sheet_names = [registro['sheet_name'] for registro in registros]
-        return sheet_names
-    
-    def get_resum_by_id(self, id):
-        resum = Query()
-        result = self.resums.search(resum.id == id)
-        return result[0] if result else None
-    
-    def get_resums_by_job_id(self, job_id):
-        resum = Query()
-        result = self.resums.search(resum.job_id == job_id)
-        return result
-    
-    def get_analysis_by_job_id(self, job_id):
-        analysis = Query()
-        result = self.analysis.search(analysis.job_id == job_id)
-        return result
-
-    def get_analysis_by_resum_id(self, resum_id):
-        analysis = Query()
-        result = self.analysis.search(analysis.resum_id == resum_id)
-        return result[0] if result else None
-
-    def update_job(self, new_data: Job):
-        query = Query()
-        self.jobs.update(new_data.model_dump(), query.id == new_data.id)
-
-    def delete_job_by_id(self, id):
-        query = Query()
-        self.jobs.remove(query.id == id)
-    
-    def delete_all_resums_by_job_id(self, job_id):
-        resum = Query()
-        self.resums.remove(resum.job_id == job_id)
-    
-    def delete_all_analysis_by_job_id(self, job_id):
-        analysis = Query()
-        self.analysis.remove(analysis.job_id == job_id)
-
-    def delete_all_files_by_job_id(self, job_id):
-        file = Query()
-        self.files.remove(file.job_id == job_id)
\ No newline at end of file
+    def offload_resum_texts(self):
+        """Move para o blob store os textos que registros antigos ainda guardam na tabela."""
+        documents = {resum.doc_id: resum for resum in self.resums.all()}
+        moved = {doc_id: offload_text_fields(resum, self.blobs) for doc_id, resum in documents.items()}
+        moved = {doc_id: resum for doc_id, resum in moved.items() if resum != documents[doc_id]}
+        if moved:
+            with self.batch():
+                for doc_id, resum in moved.items():
+                    self.resums.update(resum, doc_ids=[doc_id])
+        return len(moved)
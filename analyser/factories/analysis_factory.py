@@ -1,9 +1,9 @@
 import uuid
 import re
 from models.analysis import Analysis
-from database.tiny_db import AnalyserDatabase
+from database.backend import get_database
 
-DATABASE = AnalyserDatabase()
+DATABASE = get_database()
 
 class AnalysisFactory:
     def __init__(self, resum_content: str, job_id: str, resum_id: str, score: float):
@@ -56,7 +56,11 @@ class AnalysisFactory:
 
         return Analysis(**secoes_dict)
 
+    def build(self) -> Analysis:
+        return Analysis(**self.analysis_data)
+
     def create(self) -> Analysis:
-        analysis = Analysis(**self.analysis_data)
-        DATABASE.analysis.insert(analysis.model_dump())
+        analysis = self.build()
+        # insert_analysis também atualiza os agregados da vaga
+        DATABASE.insert_analysis(analysis)
         return analysis
@@ -1,8 +1,8 @@
 import uuid
 from models.file import File
-from database.tiny_db import AnalyserDatabase
+from database.backend import get_database
 
-DATABASE = AnalyserDatabase()
+DATABASE = get_database()
 
 class FileFactory:
     def __init__(self, job_id: str):
@@ -13,11 +13,13 @@ class FileFactory:
         if not field.strip():
             raise ValueError("job_id cannot be an empty string.")
 
-    def create(self) -> File:
-        file = File(
+    def build(self) -> File:
+        return File(
             file_id=str(uuid.uuid4()),
             job_id=self.job_id
         )
-        
+
+    def create(self) -> File:
+        file = self.build()
         DATABASE.files.insert(file.model_dump())
         return file
\ No newline at end of file
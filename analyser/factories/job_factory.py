@@ -1,8 +1,8 @@
 import uuid
 from models.job import Job
-from database.tiny_db import AnalyserDatabase
+from database.backend import get_database
 
-DATABASE = AnalyserDatabase()
+DATABASE = get_database()
 
 class JobFactory:
     def __init__(self, 
@@ -15,6 +15,7 @@ class JobFactory:
                  strategies: list,
                  qualifications: list,
                  score_qualification: list,
+                 cascade_threshold: float = 0.0,
     ):
         self._validate_fields(name, main_activities, prerequisites, differentials, sheet_name)
         
@@ -27,6 +28,7 @@ class JobFactory:
         self.strategies = strategies
         self.qualifications = qualifications
         self.score_qualification = score_qualification
+        self.cascade_threshold = cascade_threshold
     
     def _validate_fields(self, *fields):
         for field in fields:
@@ -45,6 +47,7 @@ class JobFactory:
             strategies=self.strategies,
             qualifications=self.qualifications,
             score_competence=self.score_qualification,
+            cascade_threshold=self.cascade_threshold,
         )
         DATABASE.jobs.insert(job.model_dump())
         return job
\ No newline at end of file
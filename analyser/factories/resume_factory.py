@@ -1,8 +1,8 @@
 import uuid
 from models.resum import Resum
-from database.tiny_db import AnalyserDatabase
+from database.backend import get_database
 
-DATABASE = AnalyserDatabase()
+DATABASE = get_database()
 
 class ResumFactory:
     def __init__(
@@ -14,6 +14,10 @@ class ResumFactory:
         competence: list,
         strategies: list,
         qualifications: list,
+        prescreen_score: float = None,
+        score: float = None,
+        deferred: bool = False,
+        file_hash: str = None,
     ):
         self.job_id = job_id
         self.content = content
@@ -22,9 +26,13 @@ class ResumFactory:
         self.competence = competence
         self.strategies = strategies
         self.qualifications = qualifications
+        self.prescreen_score = prescreen_score
+        self.score = score
+        self.deferred = deferred
+        self.file_hash = file_hash
 
-    def create(self) -> Resum:
-        resum = Resum(
+    def build(self) -> Resum:
+        return Resum(
             id=str(uuid.uuid4()),
             job_id=self.job_id,
             content=self.content,
@@ -32,8 +40,14 @@ class ResumFactory:
             opnion=self.opnion,
             score_competence=self.competence,
             score_strategies=self.strategies,
-            score_qualifications=self.qualifications
+            score_qualifications=self.qualifications,
+            prescreen_score=self.prescreen_score,
+            score=self.score,
+            deferred=self.deferred,
+            file_hash=self.file_hash,
         )
-        
-        DATABASE.resums.insert(resum.model_dump())
+
+    def create(self) -> Resum:
+        resum = self.build()
+        DATABASE.insert_resum(resum)
         return resum
\ No newline at end of file
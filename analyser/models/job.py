@@ -13,4 +13,6 @@ class Job(BaseModel):
     competence: List[Any]
     strategies: List[Any]
     qualifications: List[Any]
-    score_competence: List[Any]  
+    score_competence: List[Any]
+    # Nota final abaixo da qual resumo e opinião só são gerados sob demanda (0 = sempre gera)
+    cascade_threshold: float = 0.0  
@@ -0,0 +1,10 @@
+from pydantic import BaseModel
+from typing import List, Any
+
+
+class JobProfile(BaseModel):
+    hash: str
+    competence: List[Any]
+    strategies: List[Any]
+    qualifications: List[Any]
+    score_competence: List[Any]
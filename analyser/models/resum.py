@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Any
+from typing import List, Any, Optional
 
 
 class Resum(BaseModel):
@@ -11,4 +11,12 @@ class Resum(BaseModel):
     score_competence: List[Any]
     score_strategies: List[Any] 
     score_qualifications: List[Any]
+    prescreen_score: Optional[float] = None
+    score: Optional[float] = None
+    deferred: bool = False
+    # Hash do texto no blob store; content/opnion ficam vazios no registro
+    content_ref: Optional[str] = None
+    opnion_ref: Optional[str] = None
+    # sha256 do PDF; o mesmo arquivo enviado de novo é reconhecido por ele
+    file_hash: Optional[str] = None
 
@@ -0,0 +1,35 @@
+import asyncio
+import httpx
+from typing import Any, Dict, Optional
+from .interfaces import APIClient
+
+
+class AsyncHttpClient(APIClient):
+    """
+    Cliente HTTP assíncrono para a API do Ollama: uma única conexão
+    httpx com pool, limitada a max_concurrency requisições simultâneas.
+    """
+
+    def __init__(self, base_url: str, max_concurrency: int = 4, timeout: float = 300.0):
+        self._client = httpx.AsyncClient(
+            base_url=f"{base_url.rstrip('/')}/api",
+            timeout=httpx.Timeout(timeout, connect=10.0),
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def post(self, path: str, json: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        async with self._semaphore:
+            kwargs = {'timeout': timeout} if timeout is not None else {}
+            response = await self._client.post(path, json=json, **kwargs)
+            response.raise_for_status()
+            return response.json()
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
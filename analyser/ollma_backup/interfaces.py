@@ -0,0 +1,8 @@
+from abc import ABC, abstractmethod
+from typing import Any, Dict
+
+
+class APIClient(ABC):
+    @abstractmethod
+    def post(self, path: str, **kwargs) -> Dict[str, Any]:
+        ...
@@ -0,0 +1,25 @@
+from pydantic import BaseModel, ConfigDict
+from typing import Any, Dict, Optional
+
+
+class GenerateCompletionRequest(BaseModel):
+    prompt: str
+    model: Optional[str] = None
+    options: Dict[str, Any] = {}
+    stream: bool = False
+    format: Optional[str] = None
+    timeout: Optional[float] = None
+
+
+class GenerateCompletionResponse(BaseModel):
+    model_config = ConfigDict(extra='ignore')
+
+    model: str
+    response: str
+    done: bool = True
+    total_duration: Optional[int] = None
+    load_duration: Optional[int] = None
+    prompt_eval_count: Optional[int] = None
+    prompt_eval_duration: Optional[int] = None
+    eval_count: Optional[int] = None
+    eval_duration: Optional[int] = None
@@ -7,15 +7,21 @@ class AsyncCompletionService:
         self._model = model
         self._keep_alive = keep_alive
 
+    @property
+    def model(self) -> str:
+        return self._model
+
     async def generate_completion(self, request: GenerateCompletionRequest) -> GenerateCompletionResponse:
         request_data = {
-            "model": self._model,
+            "model": request.model or self._model,
             "prompt": request.prompt,
             "options": request.options,
             "stream": request.stream,
             "keep_alive": self._keep_alive
         }
-        response_data = await self._client.post("/generate", json=request_data)
+        if request.format:
+            request_data["format"] = request.format
+        response_data = await self._client.post("/generate", json=request_data, timeout=request.timeout)
         return GenerateCompletionResponse(**response_data)
 
 
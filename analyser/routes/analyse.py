@@ -1,12 +1,17 @@
-import os
+import asyncio
 import pandas as pd
 import streamlit as st
-from database.tiny_db import AnalyserDatabase
+from database.backend import get_database
+from factories.analysis_factory import AnalysisFactory
+from models.resum import Resum
+from service.async_llama_client import AsyncLlamaClient
+from service.file_service import FileService
+from service.text_preprocessor import CVPreprocessor
 from st_aggrid import AgGrid, GridOptionsBuilder, GridUpdateMode
 
 class AnalyseRoute:
     def __init__(self) -> None:
-        self.database = AnalyserDatabase()
+        self.database = get_database()
         self.jobs = [job.get('name') for job in self.database.jobs.all()]
         self.job = {}
         self.data_analysis = {}
@@ -32,11 +37,43 @@ class AnalyseRoute:
             self.job.get('qualifications'),
         )
 
+    def get_deferred_resums(self):
+        resums = self.database.get_resums_by_job_id(self.job.get('id'))
+        deferred = [resum for resum in resums if resum.get('deferred')]
+        return sorted(deferred, key=lambda resum: resum.get('score') or 0.0, reverse=True)
+
+    def complete_deferred(self, resum):
+        """
+        Gera o resumo e a opinião que a cascata adiou. O texto é extraído de
+        novo do PDF; a análise só é gravada se o resumo for válido, então uma
+        falha mantém o candidato na lista de adiados.
+        """
+        content = CVPreprocessor().process(FileService().read(resum.get('file'))).text
+
+        async def run():
+            async with AsyncLlamaClient() as ai:
+                return await asyncio.gather(ai.resume_cv(content), ai.generate_opnion(content, self.job))
+
+        resum_result, opnion = asyncio.run(run())
+        analysis = AnalysisFactory(
+            resum_content=resum_result,
+            job_id=self.job.get('id'),
+            resum_id=resum.get('id'),
+            score=resum.get('score'),
+        ).build()
+        with self.database.batch():
+            self.database.insert_analysis(analysis)
+            self.database.update_resum(Resum(**{**resum, 'content': resum_result, 'opnion': opnion, 'deferred': False}))
+        return analysis
+
     def _create_selected_candidates_df(self, selected_candidates):
         return pd.DataFrame(selected_candidates)
     
-    def get_resum_by_id(self, resum_id):
-        return self.database.get_resum_by_id(resum_id)
+    def get_job_stats(self):
+        return self.database.get_job_stats(self.job.get('id'))
+
+    def get_resum_by_id(self, resum_id, with_text=False):
+        return self.database.get_resum_by_id(resum_id, with_text=with_text)
 
     # Atualizar o método _create_dataframe_to_analyse():
     def _create_dataframe_to_analyse(self):
@@ -85,15 +122,6 @@ class AnalyseRoute:
         selected_df = self._create_selected_candidates_df(response.get('selected_rows', []))
         return selected_df
 
-    def _delete_all_files_into_analyse(self):
-        for resum in self.resums:
-            path = resum.get('file')
-            if os.path.isfile(path):
-                os.remove(path)
-
     def clean_analyse(self):
-        self._set_resums()
-        self.database.delete_all_resums_by_job_id(self.job.get('id'))
-        self.database.delete_all_analysis_by_job_id(self.job.get('id'))
-        self.database.delete_all_files_by_job_id(self.job.get('id'))
-        self._delete_all_files_into_analyse()
\ No newline at end of file
+        self.database.delete_job_cascade(self.job.get('id'), keep_job=True)
+        self.resums = {}
\ No newline at end of file
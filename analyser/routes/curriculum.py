@@ -1,7 +1,13 @@
-import uuid
-from database.tiny_db import AnalyserDatabase
-from service.llama_client import LlamaClient
+import asyncio
+import os
+from database.backend import get_database
+from service.async_llama_client import AsyncLlamaClient
+from service.llm_metrics import METRICS
+from service.retry import RETRY_STATS, RetryExhausted
 from service.file_service import FileService
+from service.stored_files import file_hash
+from service.prescreen import PreScreener
+from service.text_preprocessor import CVPreprocessor
 from factories.resume_factory import ResumFactory
 from factories.analysis_factory import AnalysisFactory
 import streamlit as st
@@ -11,85 +17,374 @@ import traceback
 
 DESTINATION_PATH = 'storage'
 MAX_PROCESSING_TIME = 300  # 5 minutos de timeout
+# Avalia nota final e vetores de competências em uma única chamada JSON
+COMBINED_EVALUATION = os.getenv('COMBINED_EVALUATION', 'true').lower() == 'true'
+# Currículos por prompt nas notas das categorias (0 ou 1 = um currículo por chamada)
+SCORE_BATCH_SIZE = int(os.getenv('SCORE_BATCH_SIZE', '0'))
+# Orçamento de tokens de cada currículo dentro do prompt em lote
+BATCH_CV_TOKEN_BUDGET = int(os.getenv('BATCH_CV_TOKEN_BUDGET', '600'))
 
 class CurriculumRoute:
     def __init__(self) -> None:
-        self.database = AnalyserDatabase()
+        self.database = get_database()
         self.jobs = [job.get('name') for job in self.database.jobs.all()]
         self.job = {}  # Certifique-se de setar o job selecionado antes de processar
-        self._ai = LlamaClient()
         self._file_service = FileService()
+        self._preprocessor = CVPreprocessor()
+        self._prescreener = PreScreener()
+        self._compact = CVPreprocessor(token_budget=BATCH_CV_TOKEN_BUDGET)
+        self.prescreen_scores = {}
+        self.extraction_failures = []
+        self.known_resums = []
+        self.known_summaries = {}
+        self.replaced_resums = {}
     
     def get_files(self, uploaded_files):
-        saved_file_paths = self._file_service.save_uploaded_files(uploaded_files, 'storage')
-        contents = self._file_service.read_all(saved_file_paths)
-        return list(zip(contents, saved_file_paths))
+        return self.extract_files(self._file_service.save_uploaded_files(uploaded_files, DESTINATION_PATH))
+
+    def extract_files(self, saved_file_paths):
+        extracted = dict(self._file_service.extract_all(saved_file_paths))
+        files = []
+        for path in saved_file_paths:
+            if extracted[path].error:
+                self.extraction_failures.append((path, extracted[path].error))
+            else:
+                files.append((self.preprocess(extracted[path].text, path), path))
+        return files
+
+    async def stream_files(self, saved_file_paths, on_failure=None):
+        """
+        Entrega (conteúdo, caminho) à medida que cada PDF termina de ser
+        extraído. on_failure avisa dos que falharam, que não chegam ao LLM.
+        """
+        async for path, extraction in self._file_service.extract_all_async(saved_file_paths):
+            if extraction.error:
+                self.extraction_failures.append((path, extraction.error))
+                if on_failure:
+                    on_failure(path)
+            else:
+                yield self.preprocess(extraction.text, path), path
+
+    def deduplicate(self, saved_file_paths, job):
+        """
+        Tira do lote os PDFs que já têm análise para esta vaga (mesmo hash) e
+        guarda o resumo dos que já passaram por outra vaga: o resumo não
+        depende da vaga e não precisa ser gerado de novo. Currículos da vaga
+        sem análise (fora da triagem, que é relativa ao lote, ou adiados)
+        passam pelo fluxo de novo e o registro antigo é substituído.
+        """
+        self.known_resums = []
+        self.known_summaries = {}
+        self.replaced_resums = {}
+        new_paths = []
+        for path in saved_file_paths:
+            resums = self.database.get_resums_by_file_hash(file_hash(path))
+            same_job = [resum for resum in resums if resum.get('job_id') == job.get('id')]
+            analysed = [resum for resum in same_job if self.database.get_analysis_by_resum_id(resum.get('id'))]
+            if analysed:
+                self.known_resums.append(analysed[-1])
+                continue
+            if same_job:
+                self.replaced_resums[str(path)] = [resum.get('id') for resum in same_job]
+            summarized = [resum for resum in resums if resum.get('content') or resum.get('content_ref')]
+            if summarized:
+                self.known_summaries[path] = self.database.get_resum_by_id(summarized[-1].get('id'), with_text=True).get('content')
+            new_paths.append(path)
+        return new_paths
+
+    async def summarize(self, ai, content, path):
+        known = self.known_summaries.get(path)
+        return known if known else await ai.resume_cv(content)
+
+    def preprocess(self, content, path):
+        processed = self._preprocessor.process(content)
+        print(f"{path}: {processed.original_tokens} -> {processed.tokens} tokens ({processed.saved_tokens} economizados)")
+        return processed.text
    
-    def process_single_cv(self, content, path, job):
+    def prescreen(self, files_to_process, job):
+        """
+        Ordena o lote contra a vaga e devolve (selecionados, descartados).
+        Os descartados são gravados só com a nota da triagem, sem passar pelo LLM.
+        """
+        ranking = {result.path: result for result in self._prescreener.rank(job, files_to_process)}
+        self.prescreen_scores = {path: result.score for path, result in ranking.items()}
+        selected = []
+        skipped = []
+        for content, path in files_to_process:
+            result = ranking[path]
+            print(f"{path}: triagem {result.score:.3f} (#{result.rank})")
+            if result.selected:
+                selected.append((content, path))
+            else:
+                skipped.append(result)
+        return selected, skipped
+
+    def build_records(self, results, skipped, job):
+        """
+        Monta os registros do lote para uma única gravação com database.persist.
+        Currículo cujo resumo não rende uma análise válida fica de fora e
+        volta em `failures`, sem deixar um Resum órfão no banco.
+        """
+        resums = []
+        analyses = []
+        failures = []
+        for result in skipped:
+            resums.append(ResumFactory(
+                job_id=job.get('id'),
+                content='',
+                file=result.path,
+                opnion='',
+                competence=[],
+                strategies=[],
+                qualifications=[],
+                prescreen_score=result.score,
+                file_hash=file_hash(result.path),
+            ).build())
+
+        for result in results:
+            deferred = result.get('deferred', False)
+            resum = ResumFactory(
+                job_id=job.get('id'),
+                content=result['resum_result'],
+                file=result['path'],
+                opnion=result['opnion'],
+                competence=result['score_competence'],
+                strategies=result['score_strategies'],
+                qualifications=result['score_qualifications'],
+                prescreen_score=self.prescreen_scores.get(result['path']),
+                score=result['score'],
+                deferred=deferred,
+                file_hash=file_hash(result['path']),
+            ).build()
+            if not deferred:
+                try:
+                    analyses.append(AnalysisFactory(
+                        resum_content=result['resum_result'],
+                        job_id=job.get('id'),
+                        resum_id=resum.id,
+                        score=result['score'],
+                    ).build())
+                except ValueError as err:
+                    failures.append((result['path'], err))
+                    continue
+            resums.append(resum)
+        return resums, analyses, failures
+
+    async def score_batch(self, ai, chunk, job):
+        """
+        Notas das três listas de categorias para um lote de currículos, com
+        uma chamada por lista. Devolve {caminho: vetores}.
+        """
+        cvs = [self._compact.process(content).text for content, _ in chunk]
+        competence, strategies, qualifications = await asyncio.gather(
+            ai.score_qualifications_batch(cvs, job.get('competence')),
+            ai.score_qualifications_batch(cvs, job.get('strategies')),
+            ai.score_qualifications_batch(cvs, job.get('qualifications')),
+        )
+        return {
+            path: {
+                'score_competence': competence[index],
+                'score_strategies': strategies[index],
+                'score_qualifications': qualifications[index],
+            }
+            for index, (_, path) in enumerate(chunk)
+        }
+
+    async def _batch_vectors(self, batch, path):
+        return (await batch)[path]
+
+    async def evaluate_scores(self, ai, content, job, vectors=None):
+        if vectors is not None:
+            # Vetores vindos do prompt em lote; aqui só falta a nota final
+            score, batch_scores = await asyncio.gather(ai.generate_score(content, job), vectors, return_exceptions=True)
+            if isinstance(score, BaseException):
+                raise score
+            if not isinstance(batch_scores, BaseException):
+                return {'score': score, **batch_scores}
+            print(f"Notas em lote indisponíveis, usando chamadas individuais: {batch_scores}")
+            return {'score': score, **await self.score_vectors(ai, content, job)}
+
+        if COMBINED_EVALUATION:
+            try:
+                return await ai.evaluate_cv(content, job)
+            except RetryExhausted as err:
+                print(f"Avaliação combinada inválida, usando chamadas individuais: {err}")
+
+        score, vectors = await asyncio.gather(ai.generate_score(content, job), self.score_vectors(ai, content, job))
+        return {'score': score, **vectors}
+
+    async def score_vectors(self, ai, content, job):
+        score_competence, score_strategies, score_qualifications = await asyncio.gather(
+            ai.score_qualifications(content, job.get('competence')),
+            ai.score_qualifications(content, job.get('strategies')),
+            ai.score_qualifications(content, job.get('qualifications')),
+        )
+        return {
+            'score_competence': score_competence,
+            'score_strategies': score_strategies,
+            'score_qualifications': score_qualifications,
+        }
+
+    async def process_single_cv_async(self, ai, content, path, job, vectors=None):
         try:
-            resum_result = self._ai.resume_cv(content)
-            opnion = self._ai.generate_opnion(content, job)
-            score = self._ai.generate_score(content, job)
-            score_competence = self._ai.score_qualifications(content, job.get('competence'))
-            score_strategies = self._ai.score_qualifications(content, job.get('strategies'))
-            score_qualifications = self._ai.score_qualifications(content, job.get('qualifications'))
+            threshold = job.get('cascade_threshold') or 0.0
+            if not threshold:
+                resum_result, opnion, scores = await asyncio.gather(
+                    self.summarize(ai, content, path),
+                    ai.generate_opnion(content, job),
+                    self.evaluate_scores(ai, content, job, vectors),
+                )
+            else:
+                # Cascata: as notas saem primeiro e resumo/opinião ficam para
+                # depois quando o candidato não atinge a nota mínima da vaga
+                scores = await self.evaluate_scores(ai, content, job, vectors)
+                if scores['score'] < threshold:
+                    return {'resum_result': '', 'opnion': '', **scores, 'path': path, 'deferred': True}
+                resum_result, opnion = await asyncio.gather(
+                    self.summarize(ai, content, path),
+                    ai.generate_opnion(content, job),
+                )
             
             return {
                 'resum_result': resum_result,
                 'opnion': opnion,
-                'score': score,
-                'score_competence': score_competence,
-                'score_strategies': score_strategies,
-                'score_qualifications': score_qualifications,
+                **scores,
                 'path': path
             }
         except Exception as e:
             st.error(f"Erro ao processar currículo {path}: {str(e)}")
             return None
 
+    def process_single_cv(self, content, path, job):
+        async def run():
+            async with AsyncLlamaClient() as ai:
+                return await self.process_single_cv_async(ai, content, path, job)
+        return asyncio.run(run())
+
+    async def process_all(self, files_to_process, job, on_result=None):
+        """
+        Processa todos os currículos em um único event loop; a
+        concorrência real é limitada pelo semáforo do AsyncLlamaClient.
+        """
+        results = []
+        async with AsyncLlamaClient() as ai:
+            tasks = []
+            batches = []
+
+            def start(chunk):
+                vectors = {}
+                if SCORE_BATCH_SIZE > 1:
+                    batch = asyncio.ensure_future(self.score_batch(ai, chunk, job))
+                    batches.append(batch)
+                    vectors = {path: self._batch_vectors(batch, path) for _, path in chunk}
+                tasks.extend(
+                    asyncio.ensure_future(self.process_single_cv_async(ai, content, path, job, vectors.get(path)))
+                    for content, path in chunk
+                )
+
+            # Lista pronta ou fluxo da extração: cada currículo entra no LLM
+            # assim que o texto (ou o lote de notas dele) está disponível
+            try:
+                chunk = []
+                async for item in self._iterate(files_to_process):
+                    chunk.append(item)
+                    if len(chunk) >= max(SCORE_BATCH_SIZE, 1):
+                        start(chunk)
+                        chunk = []
+                if chunk:
+                    start(chunk)
+                for i, task in enumerate(asyncio.as_completed(tasks, timeout=MAX_PROCESSING_TIME), 1):
+                    result = await task
+                    if on_result:
+                        on_result(i, result)
+                    if result:
+                        results.append(result)
+            except asyncio.TimeoutError:
+                st.error("Tempo máximo de processamento excedido!")
+            finally:
+                for task in tasks + batches:
+                    task.cancel()
+                await asyncio.gather(*tasks, *batches, return_exceptions=True)
+        print(f"Retentativas de LLM: {RETRY_STATS.snapshot()}")
+        return results
+
+    async def _iterate(self, files_to_process):
+        if hasattr(files_to_process, '__aiter__'):
+            async for item in files_to_process:
+                yield item
+        else:
+            for item in files_to_process:
+                yield item
+
     # Corrigindo o método de análise: agora ele faz parte da classe
     def create_analyse(self, uploaded_files, job_name):
         if 'processed' not in st.session_state:
             st.session_state.processed = False
         
         if not st.session_state.processed:
+            self.job = self.database.get_job_by_name(job_name) or {}
             progress_text = st.empty()
             progress_bar = st.progress(0)
             
             try:
-                files_to_process = self.get_files(uploaded_files)
-                total_files = len(files_to_process)
-                analysis_results = []
-                
-                with concurrent.futures.ThreadPoolExecutor() as executor:
-                    futures = [
-                        executor.submit(self.process_single_cv, content, path, self.job)
-                        for content, path in files_to_process
-                    ]
-                    
-                    start_time = time.time()
-                    for i, future in enumerate(concurrent.futures.as_completed(futures), 1):
-                        if time.time() - start_time > MAX_PROCESSING_TIME:
-                            st.error("Tempo máximo de processamento excedido!")
-                            break
-                        progress_text.text(f"Processando curriculum {i} de {total_files}")
-                        progress_bar.progress(i / total_files)
-                        result = future.result()
-                        if result:
-                            analysis_results.append(result)
+                saved_file_paths = self.deduplicate(
+                    self._file_service.save_uploaded_files(uploaded_files, DESTINATION_PATH), self.job
+                )
+                # PDFs que falham na extração também contam, senão o fluxo nunca chega a 100%
+                done = {'count': 0}
+
+                def advance(*_):
+                    done['count'] += 1
+                    progress_text.text(f"Processando curriculum {done['count']} de {total_files}")
+                    progress_bar.progress(min(done['count'] / total_files, 1.0))
+
+                if self._prescreener.enabled:
+                    # A triagem compara o lote inteiro, então espera todas as extrações
+                    files_to_process, skipped = self.prescreen(self.extract_files(saved_file_paths), self.job)
+                    total_files = len(files_to_process)
+                else:
+                    files_to_process, skipped = self.stream_files(saved_file_paths, on_failure=advance), []
+                    total_files = len(saved_file_paths)
+                if self.known_resums:
+                    st.info(f"{len(self.known_resums)} currículo(s) já analisado(s) para esta vaga; resultados mantidos.")
+                    for resum in self.known_resums:
+                        analysis = self.database.get_analysis_by_resum_id(resum.get('id')) or {}
+                        st.write(f"♻️ {analysis.get('name') or resum.get('file')}: `{resum.get('score') or analysis.get('score') or 0.0:.1f}`")
+                if skipped:
+                    st.info(f"{len(skipped)} currículo(s) abaixo da triagem gravados sem avaliação completa.")
+
+                analysis_results = asyncio.run(self.process_all(files_to_process, self.job, advance))
                 
                 progress_text.empty()
                 progress_bar.empty()
                 
+                resums, analyses, failures = self.build_records(analysis_results, skipped, self.job)
+                # Só sai o registro antigo do PDF que ganhou um novo neste lote
+                replaced = [resum_id for resum in resums for resum_id in self.replaced_resums.get(resum.file, [])]
+                self.database.persist(resums=resums, analyses=analyses, replaced=replaced)
+                METRICS.flush()
+                for path, err in self.extraction_failures:
+                    st.error(f"Erro ao ler o PDF {path}: {err}")
+                for path, err in failures:
+                    st.error(f"Erro ao gravar currículo {path}: {err}")
+                
                 if not analysis_results:
-                    st.warning("Nenhum currículo processado com sucesso.")
+                    if not self.known_resums:
+                        st.warning("Nenhum currículo processado com sucesso.")
                     return
                 
+                deferred = [result for result in analysis_results if result.get('deferred')]
+                if deferred:
+                    st.info(f"{len(deferred)} currículo(s) abaixo da nota mínima: resumo e opinião serão gerados na página Analise.")
+                
                 for result in analysis_results:
+                    if result.get('deferred'):
+                        continue
                     st.subheader(f"📌 Análise do Currículo para a vaga: **{job_name}**")
                     st.write("### **Resumo da IA:**", result['resum_result'])
                     st.write("### **Opinião da IA:**", result['opnion'])
                     st.write("## **📊 Pontuação Final**")
+                    st.write(f"🔎 **Triagem:** `{self.prescreen_scores.get(result['path'], 0.0):.2f}`")
                     st.write(f"✅ **Relevantidade para a Vaga:** `{result['score_competence'][0]:.1f}`")
                     st.write(f"🔧 **Conhecimento em IoT e IIoT:** `{result['score_strategies'][0]:.1f}`")
                     st.write(f"🏭 **Experiência com Sistemas Industriais:** `{result['score_qualifications'][0]:.1f}`")
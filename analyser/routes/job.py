@@ -1,9 +1,9 @@
 import uuid
 from streamlit_option_menu import option_menu
-from database.tiny_db import AnalyserDatabase
+from database.backend import get_database
 from factories.job_factory import JobFactory
 from models.job import Job
-from service.llama_client import LlamaClient
+from service.job_profile import JobProfileService, job_profile_hash
 
 
 DESTINATION_PATH = 'storage'
@@ -15,8 +15,8 @@ MENUS = (
 
 class JobRoute:
     def __init__(self) -> None:
-        self.llm = LlamaClient()
-        self.database = AnalyserDatabase()
+        self.database = get_database()
+        self.profiles = JobProfileService(self.database)
         self.jobs = [job.get('name') for job in self.database.jobs.all()]
         self.job = {}
         print(self.jobs)
@@ -38,6 +38,9 @@ class JobRoute:
         main_activities = st.text_area('Atividades Principais')
         prerequisites = st.text_area('Pré Requisitos')
         differentials = st.text_area('Diferenciais')
+        cascade_threshold = st.number_input(
+            'Nota mínima para gerar resumo e opinião na hora', min_value=0.0, max_value=10.0, value=0.0, step=0.5
+        )
         
         if st.form_submit_button('Salvar'):
             if not all([sheet_name, job_name, main_activities, prerequisites, differentials]):
@@ -52,10 +55,7 @@ class JobRoute:
             }
             
             with st.spinner('Aguarde um momento...'):
-                competence = self.llm.create_competence(job_dict)
-                strategies = self.llm.create_strategies(job_dict)
-                qualification = self.llm.create_qualification(job_dict)
-                score_qualification = self.llm.score_competence(job_dict, qualification)
+                profile = self.profiles.get_or_create(job_dict)
                 
                 JobFactory(
                     name=job_name,
@@ -63,10 +63,11 @@ class JobRoute:
                     prerequisites=prerequisites,
                     differentials=differentials,
                     sheet_name=sheet_name,
-                    competence=competence,
-                    strategies=strategies,
-                    qualifications=qualification,
-                    score_qualification=score_qualification,
+                    competence=profile.competence,
+                    strategies=profile.strategies,
+                    qualifications=profile.qualifications,
+                    score_qualification=profile.score_competence,
+                    cascade_threshold=cascade_threshold,
                 ).create()
                 
                 st.success('Vaga salva com sucesso!')
@@ -78,35 +79,69 @@ class JobRoute:
         all_sheet_names = self.database.get_all_sheet_names_in_jobs()
         print(all_sheet_names)
         job = self.database.get_job_by_name(options)
+        self.profiles.remember(job)
         sheet_name = st.selectbox('Nome da tabela', all_sheet_names, index=all_sheet_names.index(job['sheet_name']))
         job_name = st.text_input('Nome da Vaga', value=job.get('name'))
         main_activities = st.text_area('Atividades Principais', value=job.get('main_activities'))
         prerequisites = st.text_area('Pré Requisitos', value=job.get('prerequisites'))
         differentials = st.text_area('Diferenciais', value=job.get('differentials'))
+        cascade_threshold = st.number_input(
+            'Nota mínima para gerar resumo e opinião na hora',
+            min_value=0.0, max_value=10.0, value=float(job.get('cascade_threshold', 0.0)), step=0.5,
+        )
         if st.form_submit_button('Salvar'):
             if not all([sheet_name, job_name, main_activities, prerequisites, differentials]):
                     st.error('O meu querido, não tem como salvar uma vaga sem preencher os dados!')
                     return
             
+            job_dict = {
+                'job_name': job_name,
+                'main_activities': main_activities,
+                'prerequisites': prerequisites,
+                'differentials': differentials,
+            }
+            
+            categories = self._edited_categories(st, job, job_dict)
+            
             job_schema = Job(
-                job.get('id'),
-                job_name,
-                main_activities,
-                prerequisites,
-                differentials,
-                sheet_name
+                id=job.get('id'),
+                name=job_name,
+                main_activities=main_activities,
+                prerequisites=prerequisites,
+                differentials=differentials,
+                sheet_name=sheet_name,
+                cascade_threshold=cascade_threshold,
+                **categories,
             )
             
             self.database.update_job(job_schema)
             st.success('Vaga salva com sucesso')
     
+    def _edited_categories(self, st, job, job_dict):
+        """
+        As notas dos currículos já avaliados seguem a ordem das categorias
+        da vaga; com currículos gravados as categorias atuais são mantidas,
+        senão os gráficos comparariam notas de outras competências.
+        """
+        current = {field: job.get(field, []) for field in ('competence', 'strategies', 'qualifications', 'score_competence')}
+        if self.database.get_resums_by_job_id(job.get('id')):
+            edited = job_profile_hash(job_dict['main_activities'], job_dict['prerequisites'], job_dict['differentials'])
+            if edited != job_profile_hash(job['main_activities'], job['prerequisites'], job['differentials']):
+                st.warning(
+                    'A vaga já tem currículos avaliados, então as competências e qualificações foram mantidas. '
+                    'Para gerá-las a partir da nova descrição, use "Limpar Análise" e salve a vaga de novo.'
+                )
+            return current
+
+        with st.spinner('Aguarde um momento...'):
+            # Descrição inalterada reaproveita o perfil gravado, sem chamar o LLM
+            profile = self.profiles.get_or_create(job_dict)
+        return {field: getattr(profile, field) for field in current}
+
     def remove_job_form(self, st, option):
         job_id = self.database.get_job_by_name(option).get('id')
         if st.button('Excluir') and option:
-            self.database.delete_job_by_id(job_id)
-            self.database.delete_all_resums_by_job_id(job_id)
-            self.database.delete_all_files_by_job_id(job_id)
-            self.database.delete_all_analysis_by_job_id(self.job.get('id'))
+            self.database.delete_job_cascade(job_id)
             st.success('Vaga excluida com sucesso')
 
         
\ No newline at end of file
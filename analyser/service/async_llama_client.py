@@ -0,0 +1,197 @@
+import asyncio
+import os
+import time
+from dotenv import load_dotenv
+from ollma_backup.http_client import AsyncHttpClient
+from ollma_backup.models import GenerateCompletionRequest
+from ollma_backup.services import AsyncCompletionService
+from service.llm_cache import LLMCache, get_llm_cache
+from service.llm_metrics import METRICS, Usage, usage_from_ollama
+from service.model_routing import DEFAULT_MODEL, DEFAULT_ROUTE, load_routes
+from service.retry import DEFAULT_POLICY, RETRY_STATS, TRANSIENT_ERRORS, RetryExhausted
+from service.single_flight import ASYNC_INFLIGHT
+from service import prompts
+
+load_dotenv()
+
+OLLAMA_HOST = os.getenv('OLLAMA_HOST', 'http://localhost:11434')
+OLLAMA_MAX_CONCURRENCY = int(os.getenv('OLLAMA_MAX_CONCURRENCY', '4'))
+OLLAMA_REQUEST_TIMEOUT = float(os.getenv('OLLAMA_REQUEST_TIMEOUT', '300'))
+# Tempo que o modelo fica carregado entre chamadas; com ele descarregado o prefixo em cache se perde
+OLLAMA_KEEP_ALIVE = os.getenv('OLLAMA_KEEP_ALIVE', '5m')
+
+
+class AsyncLlamaClient:
+    """
+    Versão asyncio do LlamaClient. Todas as chamadas compartilham um
+    httpx.AsyncClient com pool e um semáforo de requisições em andamento,
+    então deve ser aberto e fechado dentro do mesmo event loop.
+
+    As chamadas de um mesmo currículo enviam o prompt completo, que começa
+    sempre pelo mesmo prefixo (ver prompts.py): o Ollama reaproveita o
+    prefixo já processado enquanto o modelo continua carregado (keep_alive).
+    """
+
+    def __init__(
+        self,
+        model=DEFAULT_MODEL,
+        base_url=OLLAMA_HOST,
+        max_concurrency=OLLAMA_MAX_CONCURRENCY,
+        timeout=OLLAMA_REQUEST_TIMEOUT,
+        use_cache=True,
+        retry_policy=DEFAULT_POLICY,
+        keep_alive=OLLAMA_KEEP_ALIVE,
+        routes=None,
+    ):
+        self.routes = routes or load_routes()
+        self.timeout = timeout
+        self.retry_policy = retry_policy
+        self._http = AsyncHttpClient(base_url, max_concurrency=max_concurrency, timeout=timeout)
+        self._service = AsyncCompletionService(self._http, model, keep_alive=keep_alive)
+        self.cache = get_llm_cache() if use_cache else LLMCache(enabled=False)
+
+    async def aclose(self):
+        await self._http.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def generate_response(self, prompt, method=None):
+        return (await self._generate(self.route(method), prompt))[0]
+
+    def route(self, method=None):
+        return self.routes.get(method, DEFAULT_ROUTE)
+
+    async def _generate(self, route, prompt):
+        key = self._cache_key(route, prompt)
+        # O cache é SQLite: leitura e escrita rodam numa thread para não travar o event loop
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            return cached, Usage(cache_hit=True)
+
+        async def generate():
+            request = GenerateCompletionRequest(
+                model=route.model,
+                prompt=prompt,
+                options=route.options(),
+                format=route.format,
+                timeout=self.timeout,
+            )
+            completion = await self._service.generate_completion(request)
+            await asyncio.to_thread(self.cache.set, key, completion.response)
+            return completion.response, usage_from_ollama(completion.model_dump())
+
+        (text, usage), shared = await ASYNC_INFLIGHT.do(key, generate)
+        return (text, Usage(cache_hit=True)) if shared else (text, usage)
+
+    def forget_response(self, prompt, method=None):
+        self.cache.delete(self._cache_key(self.route(method), prompt))
+
+    def _cache_key(self, route, prompt):
+        return self.cache.make_key(route.model, route.cache_options(), prompt)
+
+    async def _call(self, method, prompt, parse, expected_format):
+        # Mesma política de retentativas do LlamaClient._call
+        route = self.route(method)
+        usage = Usage()
+        started = time.perf_counter()
+        current_prompt = prompt
+        last_error = None
+        for attempt in range(1, self.retry_policy.max_attempts + 1):
+            try:
+                result_raw, attempt_usage = await self._generate(route, current_prompt)
+                usage.add(attempt_usage)
+            except TRANSIENT_ERRORS as err:
+                last_error = err
+            else:
+                try:
+                    result = parse(result_raw)
+                    RETRY_STATS.record(method, attempt)
+                    METRICS.record(method, route.model, usage, time.perf_counter() - started, attempt - 1)
+                    return result
+                except ValueError as err:
+                    last_error = err
+                    await asyncio.to_thread(self.forget_response, current_prompt, method)
+                    current_prompt = prompts.repair_prompt(prompt, err, expected_format)
+            print(f"{method}: tentativa {attempt}/{self.retry_policy.max_attempts} falhou: {last_error}")
+            if attempt < self.retry_policy.max_attempts:
+                await asyncio.sleep(self.retry_policy.delay(attempt))
+
+        RETRY_STATS.record(method, self.retry_policy.max_attempts, exhausted=True)
+        METRICS.record(
+            method, route.model, usage, time.perf_counter() - started,
+            self.retry_policy.max_attempts - 1, success=False,
+        )
+        raise RetryExhausted(method, self.retry_policy.max_attempts, last_error)
+
+    async def score_competence(self, job, qualifications):
+        return await self._call(
+            'score_competence',
+            prompts.score_competence_prompt(job, qualifications),
+            lambda raw: prompts.parse_scores(raw, len(qualifications)),
+            prompts.SCORES_FORMAT,
+        )
+
+    async def score_qualifications(self, cv, qualifications):
+        return await self._call(
+            'score_qualifications',
+            prompts.score_qualifications_prompt(cv, qualifications),
+            lambda raw: prompts.parse_scores(raw, len(qualifications or [])),
+            prompts.SCORES_FORMAT,
+        )
+
+    async def score_qualifications_batch(self, cvs, qualifications):
+        # Mesmo contrato do LlamaClient.score_qualifications_batch
+        qualifications = qualifications or []
+        if len(cvs) > 1:
+            try:
+                return await self._call(
+                    'score_qualifications_batch',
+                    prompts.score_batch_prompt(cvs, qualifications),
+                    lambda raw: prompts.parse_score_matrix(raw, len(cvs), qualifications),
+                    prompts.SCORE_MATRIX_FORMAT,
+                )
+            except RetryExhausted as err:
+                print(f"Lote de notas inválido, avaliando um currículo por vez: {err}")
+        return list(await asyncio.gather(*(self.score_qualifications(cv, qualifications) for cv in cvs)))
+
+    async def resume_cv(self, cv):
+        return await self._call(
+            'resume_cv', prompts.resume_cv_prompt(cv), prompts.parse_summary, prompts.SUMMARY_FORMAT,
+        )
+
+    async def create_competence(self, job):
+        return await self._call(
+            'create_competence', prompts.create_competence_prompt(job), prompts.parse_categories, prompts.CATEGORIES_FORMAT
+        )
+
+    async def create_strategies(self, job):
+        return await self._call(
+            'create_strategies', prompts.create_strategies_prompt(job), prompts.parse_categories, prompts.CATEGORIES_FORMAT
+        )
+
+    async def create_qualification(self, job):
+        return await self._call(
+            'create_qualification', prompts.create_qualification_prompt(job), prompts.parse_categories, prompts.CATEGORIES_FORMAT
+        )
+
+    async def generate_score(self, cv, job):
+        return await self._call(
+            'generate_score', prompts.generate_score_prompt(cv, job), prompts.parse_final_score, prompts.FINAL_SCORE_FORMAT,
+        )
+
+    async def generate_opnion(self, cv, job):
+        return await self._call(
+            'generate_opnion', prompts.generate_opnion_prompt(cv, job), prompts.parse_text, prompts.TEXT_FORMAT,
+        )
+
+    async def evaluate_cv(self, cv, job):
+        return await self._call(
+            'evaluate_cv',
+            prompts.evaluate_cv_prompt(cv, job),
+            lambda raw: prompts.parse_evaluation(raw, job),
+            prompts.EVALUATION_FORMAT,
+        )
@@ -1,27 +1,374 @@
+import asyncio
+import itertools
+import json
+import concurrent.futures
+import concurrent.futures.process
+import multiprocessing
+import os
+import signal
+import time
 import fitz, uuid
-from pathlib import Path
+from dataclasses import dataclass
+from typing import Optional
+from service.stored_files import STORAGE_CHUNK, StoredFile, extraction_cache_files, extraction_cache_path
 
 
-class FileService:   
+# Limites por arquivo: um PDF de 300 páginas não segura o lote inteiro
+EXTRACT_MAX_PAGES = int(os.getenv('EXTRACT_MAX_PAGES', '30'))
+EXTRACT_TIMEOUT = float(os.getenv('EXTRACT_TIMEOUT', '20'))
+# O limite acima só é conferido entre páginas; um PDF que passa desse prazo está
+# preso numa página e o pool é recriado
+EXTRACT_KILL_TIMEOUT = float(os.getenv('EXTRACT_KILL_TIMEOUT', str(EXTRACT_TIMEOUT * 2)))
+# 0 = um processo por núcleo
+EXTRACT_WORKERS = int(os.getenv('EXTRACT_WORKERS', '0')) or os.cpu_count() or 1
+# Texto extraído fica ao lado do PDF (<sha256>.<versão>.json); mude EXTRACTOR_VERSION ao alterar extract_text
+EXTRACTOR_VERSION = 2
+EXTRACT_CACHE_DISABLED = os.getenv('EXTRACT_CACHE_DISABLED', 'false').lower() == 'true'
+
+
+@dataclass
+class Extraction:
+    path: str
+    text: str
+    pages: int
+    total_pages: int
+    seconds: float
+    truncated: bool = False
+    error: Optional[str] = None
+    timed_out: bool = False
+    cached: bool = False
+
+
+def extractor_version(max_pages=EXTRACT_MAX_PAGES):
+    """Muda com o código, com a versão do PyMuPDF e com o limite de páginas."""
+    return f'v{EXTRACTOR_VERSION}-{fitz.VersionBind}-p{max_pages}'
+
+
+def cached_extraction(path, max_pages=EXTRACT_MAX_PAGES):
+    """
+    Extração guardada de uma leitura anterior do mesmo conteúdo, ou None.
+    O cache guarda o texto bruto: a normalização depende do token_budget de
+    cada CVPreprocessor (o lote de notas usa um menor) e custa uma fração
+    de milissegundo, contra a leitura do PDF.
+    """
+    if EXTRACT_CACHE_DISABLED:
+        return None
+    try:
+        data = json.loads(extraction_cache_path(path, extractor_version(max_pages)).read_text(encoding='utf-8'))
+    except (FileNotFoundError, ValueError):
+        return None
+    return Extraction(path=str(path), seconds=0.0, cached=True, **data)
+
+
+def _store_extraction(path, extraction, max_pages):
+    cache_path = extraction_cache_path(path, extractor_version(max_pages))
+    temporary = cache_path.with_name(f'.{uuid.uuid4()}.tmp')
+    temporary.write_text(json.dumps({
+        'text': extraction.text,
+        'pages': extraction.pages,
+        'total_pages': extraction.total_pages,
+        'truncated': extraction.truncated,
+    }, ensure_ascii=False), encoding='utf-8')
+    os.replace(temporary, cache_path)
+    # Extrações de versões anteriores do extrator não serão mais lidas
+    for stale in extraction_cache_files(path):
+        if stale != cache_path:
+            stale.unlink(missing_ok=True)
+
+
+def extract_text(path, max_pages=EXTRACT_MAX_PAGES, timeout=EXTRACT_TIMEOUT):
+    """
+    Extrai o texto página a página e para no limite de páginas ou de tempo.
+    Roda nos processos do pool, por isso é uma função de módulo.
+    """
+    cached = cached_extraction(path, max_pages)
+    if cached:
+        return cached
+    started = time.perf_counter()
+    pages = []
+    timed_out = False
+    with fitz.open(path) as doc:
+        total_pages = doc.page_count
+        for index, page in enumerate(doc):
+            if index >= max_pages:
+                break
+            if time.perf_counter() - started > timeout:
+                timed_out = True
+                break
+            pages.append(page.get_text())
+    extraction = Extraction(
+        path=str(path),
+        # \f separa as páginas: o CVPreprocessor identifica cabeçalhos e rodapés por página
+        text='\f'.join(pages),
+        pages=len(pages),
+        total_pages=total_pages,
+        seconds=time.perf_counter() - started,
+        truncated=len(pages) < total_pages,
+        timed_out=timed_out,
+    )
+    # O corte por tempo depende da máquina; só o resultado completo vai para o cache
+    if not timed_out and not EXTRACT_CACHE_DISABLED:
+        try:
+            _store_extraction(path, extraction, max_pages)
+        except OSError as err:
+            print(f"{path}: não foi possível gravar a extração: {err}")
+    return extraction
+
+
+_worker_events = None
+
+
+def _register_worker(events):
+    # Roda em cada worker ao iniciar: o lote precisa do pid para encerrar um worker preso
+    global _worker_events
+    _worker_events = events
+    events.put(('pid', os.getpid()))
+
+
+def _run_extraction(token, extract, path):
+    # Avisa quando o worker começa o PDF: o prazo não conta o tempo na fila nem o spawn
+    _worker_events.put(('start', token))
+    return extract(path)
+
+
+class _ExtractionPool:
+    """
+    Pool de processos de um único lote; spawn porque o Streamlit roda com
+    várias threads. Cada lote tem o seu, então encerrar os workers de um PDF
+    travado não derruba as extrações de outra sessão.
+    """
+
+    def __init__(self, workers):
+        context = multiprocessing.get_context('spawn')
+        self._events = context.SimpleQueue()
+        self._pids = set()
+        self._tokens = itertools.count()
+        self._executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=workers, mp_context=context, initializer=_register_worker, initargs=(self._events,)
+        )
+
+    def submit(self, path):
+        """Devolve (future, token); o token aparece em started() quando um worker pega o PDF."""
+        token = next(self._tokens)
+        return self._executor.submit(_run_extraction, token, extract_text, str(path)), token
+
+    def started(self):
+        tokens = []
+        while not self._events.empty():
+            kind, value = self._events.get()
+            if kind == 'pid':
+                self._pids.add(value)
+            else:
+                tokens.append(value)
+        return tokens
+
+    def terminate(self):
+        """Encerra os workers, inclusive os presos numa página, e descarta o pool."""
+        self.started()
+        for pid in self._pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        self.shutdown()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._events.close()
+
+
+def _failed(path, err):
+    return Extraction(path=str(path), text='', pages=0, total_pages=0, seconds=0.0, error=str(err))
+
+
+def _killed(path):
+    extraction = _failed(path, f'extração interrompida após {EXTRACT_KILL_TIMEOUT:g}s')
+    extraction.timed_out = True
+    return extraction
+
+
+class _ExtractionBatch:
+    """
+    Extrai os PDFs de um lote no pool dele. O prazo de EXTRACT_KILL_TIMEOUT
+    conta a partir de quando um worker começa o PDF. Quando o pool quebra
+    (um PDF passou do prazo, ou um worker morreu por falta de memória), os
+    outros PDFs em andamento voltam para a fila de um pool novo. Numa quebra
+    sem culpado conhecido, os que estavam rodando voltam um de cada vez: se
+    o pool quebrar de novo, o PDF é aquele.
+    """
+
+    # Intervalo para conferir quais PDFs já começaram enquanto algum ainda espera worker
+    POLL_INTERVAL = 0.2
+
+    def __init__(self, files):
+        self.queue = list(files)
+        self.running = {}
+        self.suspects = set()
+        self.pool = None
+
+    def fill(self):
+        # No máximo um PDF por worker: a fila fica no lote, onde pode ser refeita
+        while self.queue and len(self.running) < EXTRACT_WORKERS:
+            running = {path for path, _, _ in self.running.values()}
+            if running & self.suspects or (running and self.queue[0] in self.suspects):
+                break
+            if self.pool is None:
+                self.pool = _ExtractionPool(min(EXTRACT_WORKERS, len(self.queue)))
+            path = self.queue.pop(0)
+            future, token = self.pool.submit(path)
+            self.running[future] = (path, token, None)
+
+    def _arm_deadlines(self):
+        started = set(self.pool.started()) if self.pool else set()
+        for future, (path, token, deadline) in self.running.items():
+            if deadline is None and token in started:
+                self.running[future] = (path, token, time.monotonic() + EXTRACT_KILL_TIMEOUT)
+
+    def wait_time(self):
+        self._arm_deadlines()
+        deadlines = [deadline for _, _, deadline in self.running.values() if deadline is not None]
+        if len(deadlines) < len(self.running):
+            deadlines.append(time.monotonic() + self.POLL_INTERVAL)
+        return max(min(deadlines) - time.monotonic(), 0)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def collect(self, done):
+        results = []
+        lost = []
+        for future in done:
+            path, _, _ = self.running.pop(future)
+            try:
+                extraction = future.result()
+            except concurrent.futures.process.BrokenProcessPool as err:
+                if path not in self.suspects:
+                    lost.append(path)
+                    continue
+                # Rodava sozinho e o pool quebrou de novo: o problema é este PDF
+                extraction = _failed(path, err)
+                self.close()
+            except Exception as err:
+                extraction = _failed(path, err)
+            _log(extraction)
+            results.append((path, extraction))
+        if lost:
+            lost += [path for path, _, _ in self.running.values()]
+            self.suspects.update(lost)
+            self.running = {}
+            self.queue[:0] = lost
+            self.close()
+        return results
+
+    def expire(self):
+        now = time.monotonic()
+        expired = [future for future, (_, _, deadline) in self.running.items() if deadline is not None and deadline <= now]
+        if not expired:
+            return []
+        self.pool.terminate()
+        self.pool = None
+        results = []
+        for future in expired:
+            path, _, _ = self.running.pop(future)
+            extraction = _killed(path)
+            _log(extraction)
+            results.append((path, extraction))
+        # Perderam o worker junto com o pool, mas não foram eles que passaram do prazo
+        self.queue[:0] = [path for path, _, _ in self.running.values()]
+        self.running = {}
+        return results
+
+
+def _log(extraction):
+    if extraction.error:
+        print(f"{extraction.path}: falha na extração: {extraction.error}")
+    elif extraction.truncated:
+        print(f"{extraction.path}: {extraction.pages} de {extraction.total_pages} páginas extraídas "
+              f"em {extraction.seconds:.2f}s (limite atingido)")
+
+
+class FileService:
     def read(self, file_path):
-        content = ""
-        with fitz.open(file_path) as doc:
-            for page in doc:
-                content += page.get_text()
-        return content
-    
+        return extract_text(file_path).text
+
+    def extract_all(self, files):
+        """
+        Extrai os arquivos em paralelo e devolve (caminho, Extraction) na
+        ordem em que terminam. Arquivo que falha vem com `error` preenchido
+        em vez de interromper o lote.
+        """
+        files = list(files)
+        for path in list(files):
+            cached = cached_extraction(path)
+            if cached:
+                files.remove(path)
+                yield path, cached
+
+        batch = _ExtractionBatch(files)
+        try:
+            batch.fill()
+            while batch.running:
+                done, _ = concurrent.futures.wait(
+                    batch.running, timeout=batch.wait_time(), return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                yield from batch.collect(done)
+                yield from batch.expire()
+                batch.fill()
+        finally:
+            batch.close()
+
+    async def extract_all_async(self, files):
+        """Mesmo que extract_all, sem bloquear o event loop enquanto os PDFs são lidos."""
+        files = list(files)
+        for path in list(files):
+            cached = cached_extraction(path)
+            if cached:
+                files.remove(path)
+                yield path, cached
+
+        batch = _ExtractionBatch(files)
+        waiters = {}
+        try:
+            batch.fill()
+            while batch.running:
+                for future in batch.running:
+                    if future not in waiters:
+                        waiters[future] = asyncio.wrap_future(future)
+                        # O resultado é lido do future original; evita o aviso de exceção não lida
+                        waiters[future].add_done_callback(lambda waiter: waiter.cancelled() or waiter.exception())
+                done, _ = await asyncio.wait(
+                    [waiters[future] for future in batch.running],
+                    timeout=batch.wait_time(),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                finished = [future for future in batch.running if waiters[future] in done]
+                for path, extraction in batch.collect(finished) + batch.expire():
+                    yield path, extraction
+                for future in list(waiters):
+                    if future not in batch.running:
+                        waiters.pop(future).cancel()
+                batch.fill()
+        finally:
+            for waiter in waiters.values():
+                waiter.cancel()
+            batch.close()
+
     def read_all(self, files):
-        return [self.read(file) for file in files]
+        files = list(files)
+        extracted = {path: extraction for path, extraction in self.extract_all(files)}
+        return [extracted[path].text for path in files]
 
     def save_uploaded_files(self, uploaded_files, destination_folder):
-        destination_path = Path(destination_folder)
-        destination_path.mkdir(parents=True, exist_ok=True)
-        
+        """Grava os uploads por conteúdo; arquivos repetidos no lote voltam uma vez só."""
         saved_file_paths = []
         for uploaded_file in uploaded_files:
-            file_path = destination_path / str(uuid.uuid4())
-            with open(file_path, "wb") as f:
-                f.write(uploaded_file.getbuffer())
-            saved_file_paths.append(file_path)
-        
-        return saved_file_paths
\ No newline at end of file
+            uploaded_file.seek(0)
+            with StoredFile(destination_folder) as stored:
+                for chunk in iter(lambda: uploaded_file.read(STORAGE_CHUNK), b''):
+                    stored.write(chunk)
+            if stored.path not in saved_file_paths:
+                saved_file_paths.append(stored.path)
+
+        return saved_file_paths
@@ -0,0 +1,63 @@
+import asyncio
+import hashlib
+import json
+import re
+from models.job_profile import JobProfile
+from service.async_llama_client import AsyncLlamaClient
+
+
+def job_profile_hash(main_activities, prerequisites, differentials):
+    # Só a descrição entra no hash: renomear ou duplicar a vaga reaproveita o perfil
+    normalized = [re.sub(r'\s+', ' ', field).strip().lower() for field in (main_activities, prerequisites, differentials)]
+    return hashlib.sha256(json.dumps(normalized, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class JobProfileService:
+    """
+    Gera as categorias e o score mínimo da vaga. As três listas de categorias
+    são independentes e saem em paralelo; o score_competence vem depois, sobre
+    as qualificações geradas. O resultado fica gravado por hash da descrição.
+    """
+
+    def __init__(self, database):
+        self.database = database
+
+    def remember(self, job):
+        # Vagas criadas antes do cache já têm as categorias; grava o perfil delas
+        profile_hash = job_profile_hash(job['main_activities'], job['prerequisites'], job['differentials'])
+        if not self.database.get_job_profile_by_hash(profile_hash):
+            self.database.insert_job_profile(JobProfile(
+                hash=profile_hash,
+                competence=job.get('competence', []),
+                strategies=job.get('strategies', []),
+                qualifications=job.get('qualifications', []),
+                score_competence=job.get('score_competence', []),
+            ))
+
+    def get_or_create(self, job_dict) -> JobProfile:
+        profile_hash = job_profile_hash(
+            job_dict['main_activities'], job_dict['prerequisites'], job_dict['differentials']
+        )
+        stored = self.database.get_job_profile_by_hash(profile_hash)
+        if stored:
+            return JobProfile(**stored)
+
+        profile = asyncio.run(self._generate(profile_hash, job_dict))
+        self.database.insert_job_profile(profile)
+        return profile
+
+    async def _generate(self, profile_hash, job_dict) -> JobProfile:
+        async with AsyncLlamaClient() as ai:
+            competence, strategies, qualifications = await asyncio.gather(
+                ai.create_competence(job_dict),
+                ai.create_strategies(job_dict),
+                ai.create_qualification(job_dict),
+            )
+            score_competence = await ai.score_competence(job_dict, qualifications)
+        return JobProfile(
+            hash=profile_hash,
+            competence=competence,
+            strategies=strategies,
+            qualifications=qualifications,
+            score_competence=score_competence,
+        )
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+CACHE_PATH = os.getenv('LLM_CACHE_PATH', 'cache/llm_cache.sqlite3')
+CACHE_MAX_BYTES = int(float(os.getenv('LLM_CACHE_MAX_MB', '256')) * 1024 * 1024)
+CACHE_DISABLED = os.getenv('LLM_CACHE_DISABLED', 'false').lower() == 'true'
+
+
+class LLMCache:
+    """
+    Cache em disco das respostas do LLM, endereçado pelo hash de
+    modelo + opções + prompt, com remoção LRU ao passar de max_bytes.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes=CACHE_MAX_BYTES, enabled=not CACHE_DISABLED):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._connection = None
+
+    def _connect(self):
+        if self._connection is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._connection = sqlite3.connect(self.path, check_same_thread=False)
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS responses ('
+                'key TEXT PRIMARY KEY, response TEXT NOT NULL, '
+                'size INTEGER NOT NULL, last_access REAL NOT NULL)'
+            )
+            self._connection.execute(
+                'CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)'
+            )
+            # Tamanho total mantido por triggers: o set não soma a tabela toda, e o total
+            # continua certo quando o app e o cron gravam no mesmo arquivo
+            self._connection.executescript('''
+                CREATE TABLE IF NOT EXISTS cache_meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+                INSERT OR IGNORE INTO cache_meta (name, value)
+                    SELECT 'total_size', COALESCE(SUM(size), 0) FROM responses;
+                CREATE TRIGGER IF NOT EXISTS responses_size_insert AFTER INSERT ON responses BEGIN
+                    UPDATE cache_meta SET value = value + NEW.size WHERE name = 'total_size';
+                END;
+                CREATE TRIGGER IF NOT EXISTS responses_size_update AFTER UPDATE OF size ON responses BEGIN
+                    UPDATE cache_meta SET value = value + NEW.size - OLD.size WHERE name = 'total_size';
+                END;
+                CREATE TRIGGER IF NOT EXISTS responses_size_delete AFTER DELETE ON responses BEGIN
+                    UPDATE cache_meta SET value = value - OLD.size WHERE name = 'total_size';
+                END;
+            ''')
+        return self._connection
+
+    @staticmethod
+    def make_key(model, options, prompt):
+        prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        payload = json.dumps({'model': model, 'options': options, 'prompt': prompt_hash}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        with self._lock:
+            connection = self._connect()
+            row = connection.execute('SELECT response FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            connection.execute('UPDATE responses SET last_access = ? WHERE key = ?', (time.time(), key))
+            connection.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key, response):
+        if not self.enabled:
+            return
+        size = len(response.encode('utf-8'))
+        with self._lock:
+            connection = self._connect()
+            # Upsert em vez de INSERT OR REPLACE: a troca pelo REPLACE não dispara o trigger de DELETE
+            connection.execute(
+                'INSERT INTO responses (key, response, size, last_access) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (key) DO UPDATE SET response = excluded.response, '
+                'size = excluded.size, last_access = excluded.last_access',
+                (key, response, size, time.time())
+            )
+            self._evict(connection)
+            connection.commit()
+
+    def delete(self, key):
+        if not self.enabled:
+            return
+        with self._lock:
+            connection = self._connect()
+            connection.execute('DELETE FROM responses WHERE key = ?', (key,))
+            connection.commit()
+
+    def _total_size(self, connection):
+        return connection.execute("SELECT value FROM cache_meta WHERE name = 'total_size'").fetchone()[0]
+
+    def _evict(self, connection):
+        total = self._total_size(connection)
+        if total <= self.max_bytes:
+            return
+        # Percorre pelo índice de last_access só até voltar ao limite
+        expired = []
+        for key, size in connection.execute('SELECT key, size FROM responses ORDER BY last_access'):
+            if total <= self.max_bytes:
+                break
+            expired.append((key,))
+            total -= size
+        connection.executemany('DELETE FROM responses WHERE key = ?', expired)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'enabled': self.enabled}
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = LLMCache()
+        return _shared_cache
@@ -0,0 +1,187 @@
+import atexit
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from service.retry import RETRY_STATS
+
+
+METRICS_PATH = os.getenv('LLM_METRICS_PATH', 'metrics/llm.prom')
+METRICS_MAX_RECORDS = int(os.getenv('LLM_METRICS_MAX_RECORDS', '5000'))
+# O .prom é regravado por uma thread a cada intervalo, nunca dentro de record()
+METRICS_WRITE_INTERVAL = float(os.getenv('LLM_METRICS_WRITE_INTERVAL', '15'))
+
+
+@dataclass
+class Usage:
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    ttft: float = 0.0
+    cache_hit: bool = False
+
+    def add(self, other):
+        self.prompt_tokens += other.prompt_tokens
+        self.completion_tokens += other.completion_tokens
+        self.ttft += other.ttft
+        self.cache_hit = other.cache_hit
+
+
+def usage_from_ollama(data):
+    """
+    Lê as contagens da resposta final do /api/generate. O Ollama não informa
+    o tempo até o primeiro token diretamente; ele é aproximado por
+    carga do modelo + processamento do prompt.
+    """
+    nanoseconds = (data.get('load_duration') or 0) + (data.get('prompt_eval_duration') or 0)
+    return Usage(
+        prompt_tokens=data.get('prompt_eval_count') or 0,
+        completion_tokens=data.get('eval_count') or 0,
+        ttft=nanoseconds / 1e9,
+    )
+
+
+@dataclass
+class CallRecord:
+    method: str
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    ttft: float
+    latency: float
+    retries: int
+    cache_hit: bool
+    success: bool = True
+    timestamp: float = field(default_factory=time.time)
+
+    @property
+    def tokens_per_second(self):
+        generation_time = self.latency - self.ttft
+        if self.cache_hit or generation_time <= 0:
+            return 0.0
+        return self.completion_tokens / generation_time
+
+
+class LLMMetrics:
+    def __init__(self, path=METRICS_PATH, max_records=METRICS_MAX_RECORDS, write_interval=METRICS_WRITE_INTERVAL):
+        self.path = Path(path) if path else None
+        self.write_interval = write_interval
+        self._lock = threading.Lock()
+        self._records = deque(maxlen=max_records)
+        self._totals = {}
+        self._dirty = False
+        self._writer = None
+
+    def record(self, method, model, usage, latency, retries, success=True):
+        record = CallRecord(
+            method=method,
+            model=model,
+            prompt_tokens=usage.prompt_tokens,
+            completion_tokens=usage.completion_tokens,
+            ttft=usage.ttft,
+            latency=latency,
+            retries=retries,
+            cache_hit=usage.cache_hit,
+            success=success,
+        )
+        with self._lock:
+            self._records.append(record)
+            totals = self._totals.setdefault((method, model), {
+                'calls': 0, 'failures': 0, 'cache_hits': 0, 'retries': 0,
+                'prompt_tokens': 0, 'completion_tokens': 0, 'latency': 0.0, 'ttft': 0.0,
+            })
+            totals['calls'] += 1
+            totals['failures'] += 0 if success else 1
+            totals['cache_hits'] += 1 if record.cache_hit else 0
+            totals['retries'] += retries
+            totals['prompt_tokens'] += record.prompt_tokens
+            totals['completion_tokens'] += record.completion_tokens
+            totals['latency'] += latency
+            totals['ttft'] += record.ttft
+            self._dirty = True
+            self._start_writer()
+        return record
+
+    def _start_writer(self):
+        # Chamado com o lock; a thread e o atexit são registrados na primeira chamada
+        if not self.path or self._writer is not None:
+            return
+        self._writer = threading.Thread(target=self._write_periodically, name='llm-metrics', daemon=True)
+        self._writer.start()
+        atexit.register(self.flush)
+
+    def _write_periodically(self):
+        while True:
+            time.sleep(self.write_interval)
+            self.flush()
+
+    def flush(self):
+        """Grava o .prom se houve chamadas desde a última gravação; use ao fim de cada lote."""
+        with self._lock:
+            dirty, self._dirty = self._dirty, False
+        if dirty:
+            self.write_prometheus()
+
+    def records(self):
+        with self._lock:
+            return [dict(asdict(record), tokens_per_second=record.tokens_per_second) for record in self._records]
+
+    def summary(self):
+        with self._lock:
+            rows = []
+            for (method, model), totals in self._totals.items():
+                calls = totals['calls']
+                generation_time = totals['latency'] - totals['ttft']
+                rows.append({
+                    'method': method,
+                    'model': model,
+                    'calls': calls,
+                    'failures': totals['failures'],
+                    'cache_hits': totals['cache_hits'],
+                    'retries': totals['retries'],
+                    'prompt_tokens': totals['prompt_tokens'],
+                    'completion_tokens': totals['completion_tokens'],
+                    'avg_ttft': totals['ttft'] / calls,
+                    'avg_latency': totals['latency'] / calls,
+                    'total_latency': totals['latency'],
+                    'tokens_per_second': totals['completion_tokens'] / generation_time if generation_time > 0 else 0.0,
+                })
+            return sorted(rows, key=lambda row: row['total_latency'], reverse=True)
+
+    def to_prometheus(self):
+        counters = [
+            ('llm_calls_total', 'calls', 'Chamadas ao LLM por método'),
+            ('llm_call_failures_total', 'failures', 'Chamadas que esgotaram as tentativas'),
+            ('llm_cache_hits_total', 'cache_hits', 'Respostas servidas pelo cache'),
+            ('llm_retries_total', 'retries', 'Tentativas extras gastas'),
+            ('llm_prompt_tokens_total', 'prompt_tokens', 'Tokens de prompt processados'),
+            ('llm_completion_tokens_total', 'completion_tokens', 'Tokens gerados'),
+            ('llm_latency_seconds_sum', 'latency', 'Latência total das chamadas'),
+            ('llm_ttft_seconds_sum', 'ttft', 'Tempo até o primeiro token, somado'),
+        ]
+        with self._lock:
+            totals = dict(self._totals)
+        lines = []
+        for name, key, description in counters:
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} counter')
+            for (method, model), values in sorted(totals.items()):
+                lines.append(f'{name}{{method="{method}",model="{model}"}} {values[key]}')
+        lines.append('# HELP llm_retry_exhausted_total Chamadas que esgotaram a política de retentativas')
+        lines.append('# TYPE llm_retry_exhausted_total counter')
+        for method, values in sorted(RETRY_STATS.snapshot().items()):
+            lines.append(f'llm_retry_exhausted_total{{method="{method}"}} {values["exhausted"]}')
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self):
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_suffix(f'.{threading.get_ident()}.tmp')
+        temporary.write_text(self.to_prometheus(), encoding='utf-8')
+        os.replace(temporary, self.path)
+
+
+METRICS = LLMMetrics()
@@ -0,0 +1,67 @@
+import json
+import os
+from dataclasses import dataclass, replace
+from typing import Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_MODEL = os.getenv('LLM_DEFAULT_MODEL', 'llama3')
+# Modelos das tarefas curtas (notas) e da opinião; por padrão todos usam o mesmo
+SMALL_MODEL = os.getenv('LLM_SMALL_MODEL', DEFAULT_MODEL)
+LARGE_MODEL = os.getenv('LLM_LARGE_MODEL', DEFAULT_MODEL)
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    model: str = DEFAULT_MODEL
+    num_predict: Optional[int] = None
+    temperature: Optional[float] = None
+    stop: Optional[Tuple[str, ...]] = None
+    format: Optional[str] = None
+
+    def options(self):
+        options = {
+            'num_predict': self.num_predict,
+            'temperature': self.temperature,
+            'stop': list(self.stop) if self.stop else None,
+        }
+        return {key: value for key, value in options.items() if value is not None}
+
+    def cache_options(self):
+        return {'format': self.format or None, **self.options()}
+
+
+DEFAULT_ROUTE = ModelRoute()
+
+SCORE_STOP = ('\n\n',)
+
+MODEL_ROUTES = {
+    'score_competence': ModelRoute(SMALL_MODEL, num_predict=48, temperature=0.0, stop=SCORE_STOP),
+    'score_qualifications': ModelRoute(SMALL_MODEL, num_predict=48, temperature=0.0, stop=SCORE_STOP),
+    'generate_score': ModelRoute(SMALL_MODEL, num_predict=32, temperature=0.0),
+    'score_qualifications_batch': ModelRoute(SMALL_MODEL, num_predict=384, temperature=0.0, format='json'),
+    'evaluate_cv': ModelRoute(SMALL_MODEL, num_predict=192, temperature=0.0, format='json'),
+    'create_competence': ModelRoute(DEFAULT_MODEL, num_predict=64, temperature=0.3),
+    'create_strategies': ModelRoute(DEFAULT_MODEL, num_predict=64, temperature=0.3),
+    'create_qualification': ModelRoute(DEFAULT_MODEL, num_predict=64, temperature=0.3),
+    'resume_cv': ModelRoute(DEFAULT_MODEL, num_predict=768, temperature=0.2),
+    'generate_opnion': ModelRoute(LARGE_MODEL, num_predict=1024, temperature=0.7),
+}
+
+
+def load_routes(overrides=None):
+    """
+    Tabela de roteamento método -> modelo/limites. LLM_ROUTES aceita um JSON
+    que sobrescreve campos por método, ex.:
+    {"generate_opnion": {"model": "llama3:70b", "num_predict": 2048}}
+    """
+    if overrides is None:
+        overrides = json.loads(os.getenv('LLM_ROUTES', '{}'))
+    routes = dict(MODEL_ROUTES)
+    for method, fields in overrides.items():
+        if 'stop' in fields and fields['stop'] is not None:
+            fields = {**fields, 'stop': tuple(fields['stop'])}
+        routes[method] = replace(routes.get(method, DEFAULT_ROUTE), **fields)
+    return routes
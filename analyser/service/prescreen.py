@@ -0,0 +1,113 @@
+import math
+import os
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+
+
+# Quantos currículos seguem para a avaliação completa (0 = todos)
+PRESCREEN_TOP_K = int(os.getenv('PRESCREEN_TOP_K', '0'))
+# Nota mínima da triagem, de 0 a 1, para seguir para o LLM (0 = sem corte)
+PRESCREEN_MIN_SCORE = float(os.getenv('PRESCREEN_MIN_SCORE', '0'))
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Diferenciais contam menos que pré-requisitos e categorias da vaga
+FIELD_WEIGHTS = {
+    'prerequisites': 1.0,
+    'competence': 1.0,
+    'strategies': 1.0,
+    'qualifications': 1.0,
+    'differentials': 0.5,
+}
+STOPWORDS = {
+    'a', 'ao', 'aos', 'as', 'com', 'como', 'da', 'das', 'de', 'do', 'dos', 'e', 'em', 'entre', 'na', 'nas',
+    'no', 'nos', 'o', 'os', 'ou', 'para', 'por', 'que', 'se', 'sem', 'sobre', 'um', 'uma', 'ter', 'ser',
+    'experiencia', 'conhecimento', 'conhecimentos', 'desejavel', 'necessario', 'boa', 'bom', 'nivel',
+    'and', 'in', 'of', 'the', 'to', 'with',
+}
+
+
+def tokenize(text):
+    text = unicodedata.normalize('NFKD', text or '').lower()
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return [token for token in re.findall(r'[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]', text)
+            if len(token) > 1 and token not in STOPWORDS]
+
+
+def job_query(job):
+    weights = {}
+    for field, weight in FIELD_WEIGHTS.items():
+        value = job.get(field) or ''
+        text = ' '.join(map(str, value)) if isinstance(value, list) else value
+        for token in tokenize(text):
+            weights[token] = max(weights.get(token, 0.0), weight)
+    return weights
+
+
+@dataclass
+class PrescreenResult:
+    path: str
+    score: float
+    rank: int
+    selected: bool
+
+
+class PreScreener:
+    """
+    Triagem barata antes do LLM: ordena os currículos do lote por BM25
+    contra os requisitos e as categorias da vaga. A nota é normalizada pela
+    de um currículo que tivesse todos os termos, então fica entre 0 e 1.
+    O IDF e o tamanho médio saem do próprio lote: a nota ordena os
+    currículos de um envio, mas o mesmo currículo pode ter outra nota em
+    outro lote, e o PRESCREEN_MIN_SCORE vale por lote.
+    """
+
+    def __init__(self, top_k=PRESCREEN_TOP_K, min_score=PRESCREEN_MIN_SCORE):
+        self.top_k = top_k
+        self.min_score = min_score
+
+    @property
+    def enabled(self):
+        return bool(self.top_k) or self.min_score > 0
+
+    def score(self, job, contents):
+        query = job_query(job)
+        documents = [Counter(tokenize(content)) for content in contents]
+        if not query or not documents:
+            return [0.0] * len(documents)
+
+        lengths = [sum(document.values()) for document in documents]
+        average_length = (sum(lengths) / len(lengths)) or 1.0
+        total = len(documents)
+        # Termo que nenhum currículo tem não deve pesar mais que um raro; sem isso,
+        # lotes pequenos teriam notas baixas só por causa dos termos ausentes
+        idf = {
+            term: math.log(1 + (total - frequency + 0.5) / (frequency + 0.5))
+            for term in query
+            for frequency in [max(1, sum(1 for document in documents if term in document))]
+        }
+        best = sum(weight * idf[term] for term, weight in query.items())
+
+        scores = []
+        for document, length in zip(documents, lengths):
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+            score = 0.0
+            for term, weight in query.items():
+                frequency = document.get(term, 0)
+                if frequency:
+                    # Saturação do BM25 limitada a 1: um termo vale no máximo o seu peso
+                    score += weight * idf[term] * min(1.0, frequency * (BM25_K1 + 1) / (frequency + norm))
+            scores.append(score / best if best else 0.0)
+        return scores
+
+    def rank(self, job, files_to_process):
+        """Recebe [(conteúdo, caminho)] e devolve um PrescreenResult por arquivo, do melhor para o pior."""
+        scores = self.score(job, [content for content, _ in files_to_process])
+        ordered = sorted(zip(scores, (path for _, path in files_to_process)), key=lambda item: item[0], reverse=True)
+        results = []
+        for rank, (score, path) in enumerate(ordered, 1):
+            selected = (not self.top_k or rank <= self.top_k) and score >= self.min_score
+            results.append(PrescreenResult(path=path, score=round(score, 4), rank=rank, selected=selected))
+        return results
@@ -0,0 +1,364 @@
+import json
+import re
+
+
+# Montagem dos prompts e leitura das respostas, compartilhadas pelos clientes síncrono e assíncrono
+
+# Os prompts de currículo começam sempre pelo mesmo prefixo (sistema + currículo,
+# e a vaga quando a tarefa depende dela) e só depois trazem as instruções da tarefa.
+# Assim o Ollama reaproveita o prefixo já processado entre as chamadas do mesmo currículo.
+SYSTEM_TEXT = 'Você é um assistente de Recursos Humanos que analisa currículos de candidatos a vagas de emprego.'
+
+
+def cv_prefix(cv):
+    return f'''{SYSTEM_TEXT}
+
+Curriculo do candidato:
+
+{cv}
+
+'''
+
+
+def job_prefix(cv, job):
+    return f'''{cv_prefix(cv)}Vaga que o candidato está se candidatando:
+
+{job}
+
+'''
+
+
+def score_competence_prompt(job, qualifications):
+    prompt = f'''
+            Abaixo segue um exemplo de **prompt** que, a partir da **descrição de uma vaga** e de suas **qualificações** definidas, solicita à IA que **gere o score mínimo** necessário para cada uma das qualificações. Esse score poderá ser usado como um parâmetro de corte ou referência para avaliar candidatos.
+
+            ### Prompt: Definir Score Necessário para Vaga
+
+            Você é um consultor de RH responsável por definir o nível mínimo de proficiência exigido para cada qualificação em uma vaga. 
+            
+            Receba a seguir:
+
+            Vaga:
+            {job}
+
+            Qualificações da vaga:
+            {qualifications}
+
+            Com base na descrição da vaga, atribua um score mínimo (entre 1 e 5, podendo ser decimal) para cada uma das qualificações. 
+            Esses scores representam o nível de proficiência mínimo esperado de um candidato para ser considerado adequado à vaga.
+            Retorne apenas a lista de 5 scores, cada um em uma linha separada, sem comentários adicionais.
+
+            **Exemplo de resultado esperado (meramente ilustrativo):**
+            3.5
+            4.0
+            2.8
+            4.3
+            3.0
+        '''
+    return prompt
+
+
+def score_qualifications_prompt(cv, qualifications):
+    prompt = cv_prefix(cv) + f'''
+            Você é um avaliador imparcial. Lista de 5 qualificações:
+            {qualifications}
+
+            Com base no que está descrito no currículo acima, avalie o nível de atendimento a cada uma dessas 5 qualificações 
+            atribuindo uma nota de 1 a 5 (podendo usar números decimais). 
+            Retorne apenas as 5 notas, cada uma em uma linha separada, sem comentários adicionais.
+
+            **Exemplo de saída esperada** (meramente ilustrativa):
+            
+            2.8
+            4.2
+            3.0
+            4.9
+            1.7
+        '''
+    return prompt
+
+
+def resume_cv_prompt(cv):
+    prompt = cv_prefix(cv) + '''
+        **Solicitação de Resumo de Currículo em Markdown:**
+
+        Por favor, gere um resumo do currículo acima, formatado em Markdown, 
+        seguindo rigorosamente o modelo abaixo. **Não adicione seções extras, 
+        tabelas ou qualquer outro tipo de formatação diferente da especificada.
+        * Preencha cada seção com as informações relevantes, 
+        garantindo que o resumo seja preciso e focado.
+
+        **Formato de Output Esperado:**
+
+        ```markdown
+        ## Nome Completo
+        nome_completo aqui
+
+        ## Experiência
+        experiencia aqui
+
+        ## Habilidades 
+        habilidades aqui
+
+        ## Educação 
+        educacao aqui
+
+        ## Idiomas 
+        idiomas aqui
+
+        '''
+    return prompt
+
+
+def create_competence_prompt(job):
+    prompt = f'''
+                Você é um consultor especializado em tecnologia. 
+                Com base na vaga a seguir: {job}, crie 5 categorias para um “Radar de Competências e Ferramentas de Desenvolvimento” 
+                que abranjam linguagens de programação, frameworks, bibliotecas, sistemas de controle de versão, plataformas de cloud, 
+                ferramentas de automação e outros recursos tecnológicos relevantes para a função descrita.
+                
+                Essas categorias devem conter apenas uma palavra ou um nome composto por 2 palavras, nao mais que isso.
+                você deve responder apenas as categorias separadas por nova linha
+            '''
+    return prompt
+
+
+def create_strategies_prompt(job):
+    prompt = f'''
+                Quero que você atue como um consultor de marketing digital para a vaga de {job}.
+                Crie uma lista de 5 categorias que destaquem as principais plataformas, estratégias e métodos de otimização de campanhas 
+                de marketing relevantes para essa vaga. 
+                Considere ferramentas de anúncios, SEO, testes A/B, CRM e outras áreas que se encaixem no contexto de {job}.
+                
+                Essas categorias devem conter apenas uma palavra ou um nome composto por 2 palavras, nao mais que isso.
+                você deve responder apenas as categorias separadas por nova linha
+            '''
+    return prompt
+
+
+def create_qualification_prompt(job):
+    prompt = f'''
+            Quero que você atue como um consultor de RH especializado na vaga de {job}.
+            Crie 5 categorias que representem o perfil profissional e as qualificações desejadas para o candidato. 
+            Pense em senioridade, formação, certificações, disponibilidade, proficiência em idiomas ou outras 
+            competências comportamentais e de background relevantes para {job}.
+            
+            Essas categorias devem conter apenas uma palavra ou um nome composto por 2 palavras, nao mais que isso.
+            você deve responder apenas as categorias separadas por nova linha
+            '''
+    return prompt
+
+
+def generate_score_prompt(cv, job):
+    prompt = job_prefix(cv, job) + '''
+        **Objetivo:** Avaliar o currículo acima com base na vaga e calcular a pontuação final. A nota máxima é 10.0.
+
+        **Instruções:**
+
+        1. **Experiência (Peso: 30%)**: Avalie a relevância da experiência em relação à vaga.
+        2. **Habilidades Técnicas (Peso: 25%)**: Verifique o alinhamento das habilidades técnicas com os requisitos da vaga.
+        3. **Educação (Peso: 10%)**: Avalie a relevância da formação acadêmica para a vaga.
+        4. **Idiomas (Peso: 10%)**: Avalie os idiomas e sua proficiência em relação à vaga.
+        5. **Pontos Fortes (Peso: 15%)**: Avalie a relevância dos pontos fortes para a vaga.
+        6. **Pontos Fracos (Desconto de até 10%)**: Avalie a gravidade dos pontos fracos em relação à vaga.
+
+        **Nota Final:** Calcule a média ponderada das notas das seções, com uma nota máxima de 10.0.
+
+        **Output Esperado:**
+        ```
+        Pontuação Final: x.x
+        ```
+        
+        **Atenção:** Seja rigoroso ao atribuir as notas. A nota máxima é 10.0, e o output deve conter apenas "Pontuação Final: x.x".
+    
+    '''
+    return prompt
+
+
+def generate_opnion_prompt(cv, job):
+    prompt = job_prefix(cv, job) + '''
+        Vou te pedir ajuda para avaliação do candidato acima para essa vaga.
+
+        Você é um assistente de IA que incorpora a persona de um gestor de Recursos Humanos (RH) de empresas em rápido crescimento. Seu papel é atuar como um parceiro estratégico do negócio, fornecendo insights sobre os candidatos e dando recomendações para ajudar na tomada de decisão de contratação. Adote as seguintes características e estilo de comunicação em todas as interações: 
+
+        1. Mentalidade e Visão: 
+        - Mostre um foco notável em entender os requisitos da vaga e saber analisar os currículos dos candidatos a partir desses requisitos
+        - Pense constantemente na estrutura organizacional da empresa e como as novas pessoas que entrarem no time podem se encaixar da melhor forma possível 
+        - Demonstre uma motivação incessante para encontrar talentos e pessoas que realmente agreguem valor à companhia. 
+
+        2. Estilo de Comunicação: 
+
+        - Comunique-se de forma direta e franca, frequentemente usando frases curtas. 
+        - Incorpore jargão técnico do meio corporativo de RH e use conceitos científicos da psicologia organizacional ao discutir ideias. 
+        - Seja específico, constantemente citando exemplos para ilustrar ideias que você está explicando.
+        - Solicite mais informações sempre que sentir necessidade para que sua resposta não fique genérica ou incompleta.
+
+        3. Abordagem de Resolução de Problemas:
+
+        - Aplique o pensamento de primeiros princípios para decompor problemas complexos em verdades fundamentais.
+        - Use o ciclo PDCA (Plan, Do, Check e Act) como abordagem principal para todos os projetos da empresa
+        - Tenha como base os 7 hábitos das pessoas altamente eficazes descritos por Stephen R. Covey para resolver problemas (especialmente o hábito de começar pelo objetivo) 
+        - Enfatize a importância da iteração rápida e da adaptação em caso de falhas. 
+        4. Filosofia de Negócios:
+        
+        - Priorize visão e impacto a longo prazo em detrimento de lucros de curto prazo.
+        - Estenda a integração vertical e o desenvolvimento interno de todo o ecossistema de negócios.
+        - Inspire-se no desejo de atrair e reter talentos que gostem de um ambiente desafiador e missões inspiradoras.
+        - Foque em Metas e Indicadores para analisar se os projetos atuais são sustentáveis e prever quais novos projetos valem a pena ser iniciados.
+
+        5. Estilo de Recrutamento:
+        
+        - Estabeleça metas ambiciosas, mas tenha clareza do motivo por trás dessas metas.
+        - Crie um ambiente de trabalho que tenha baixa tolerância para incompetência ou burocracia.
+        - Saiba negociar remunerações de forma que a pessoa se sinta bem com a contraproposta e ao mesmo tempo beneficie a empresa, reduzindo custos
+    '''
+    return prompt
+
+
+def evaluate_cv_prompt(cv, job):
+    competence = job.get('competence') or []
+    strategies = job.get('strategies') or []
+    qualifications = job.get('qualifications') or []
+    prompt = job_prefix(cv, job) + f'''
+        **Objetivo:** Avaliar o currículo acima com base na vaga, em uma única resposta JSON.
+
+        **Instruções:**
+
+        1. "pontuacao_final": nota final de 0.0 a 10.0, calculada como média ponderada de
+           Experiência (30%), Habilidades Técnicas (25%), Educação (10%), Idiomas (10%),
+           Pontos Fortes (15%) e desconto de até 10% pelos Pontos Fracos.
+        2. "competencias": uma nota de 1 a 5 (decimais permitidos) para cada item, na mesma ordem: {competence}
+        3. "estrategias": uma nota de 1 a 5 (decimais permitidos) para cada item, na mesma ordem: {strategies}
+        4. "qualificacoes": uma nota de 1 a 5 (decimais permitidos) para cada item, na mesma ordem: {qualifications}
+
+        **Atenção:** Seja rigoroso ao atribuir as notas. Responda apenas com o JSON, sem comentários:
+        {{"pontuacao_final": x.x, "competencias": [...], "estrategias": [...], "qualificacoes": [...]}}
+    '''
+    return prompt
+
+
+def score_batch_prompt(cvs, qualifications):
+    # Categorias e instruções vêm antes dos currículos: o prefixo é o mesmo em todos os lotes da vaga
+    candidates = '\n\n'.join(f'### Candidato {index}\n{cv}' for index, cv in enumerate(cvs, 1))
+    prompt = f'''{SYSTEM_TEXT}
+        Você é um avaliador imparcial. Qualificações avaliadas:
+        {qualifications}
+
+        Para cada candidato abaixo, avalie o nível de atendimento a cada qualificação com uma
+        nota de 1 a 5 (decimais permitidos), considerando apenas o que está no currículo dele.
+
+        Responda apenas com JSON, uma lista de {len(qualifications)} notas por candidato, na ordem
+        das qualificações e na ordem dos candidatos, sem comentários:
+        {{"candidatos": [[notas do candidato 1], [notas do candidato 2], ...]}}
+
+{candidates}
+    '''
+    return prompt
+
+
+# Formato esperado de cada resposta, repetido no prompt de correção
+SCORES_FORMAT = 'apenas as notas de 1 a 5, uma por linha, sem comentários'
+CATEGORIES_FORMAT = 'apenas as categorias, uma por linha, sem comentários'
+FINAL_SCORE_FORMAT = '"Pontuação Final: x.x"'
+EVALUATION_FORMAT = 'apenas o objeto JSON pedido, com todas as listas de notas completas'
+TEXT_FORMAT = 'o texto pedido, sem deixar a resposta vazia'
+SCORE_MATRIX_FORMAT = 'apenas o objeto JSON {"candidatos": [...]}, com uma lista completa de notas por candidato'
+SUMMARY_FORMAT = 'o resumo em Markdown com as seções ## Nome Completo, ## Experiência, ## Habilidades, ## Educação e ## Idiomas'
+
+
+def repair_prompt(prompt, error, expected_format):
+    return (
+        f"{prompt}\n\n"
+        f"**Correção:** sua resposta anterior foi rejeitada ({error}). "
+        f"Responda novamente seguindo estritamente o formato: {expected_format}."
+    )
+
+
+def parse_scores(result_raw, expected=None):
+    scores = []
+    for line in result_raw.strip().split('\n'):
+        line = line.strip()
+        try:
+            scores.append(float(line))
+        except ValueError:
+            # Ignora linhas que não possam ser convertidas em float
+            pass
+    if not scores or (expected and len(scores) != expected):
+        raise ValueError(f"esperadas {expected or 'algumas'} notas, recebidas {len(scores)}")
+    return scores
+
+
+CATEGORIES_COUNT = 5
+
+
+def parse_categories(result_raw):
+    # Os prompts pedem 5 categorias; uma introdução ou lista incompleta vai para a correção
+    categories = [line.strip() for line in result_raw.strip().split('\n') if line.strip()]
+    if len(categories) != CATEGORIES_COUNT:
+        raise ValueError(f"esperadas {CATEGORIES_COUNT} categorias, recebidas {len(categories)}")
+    return categories
+
+
+def parse_summary(result_raw):
+    try:
+        summary = result_raw.split('```markdown')[1]
+    except IndexError:
+        summary = parse_text(result_raw)
+    # A AnalysisFactory extrai o nome e as seções do resumo: sem elas a análise não é gravada
+    for section in ('## Nome Completo', '## Habilidades', '## Educação'):
+        if section not in summary:
+            raise ValueError(f"seção '{section}' ausente no resumo")
+    return summary
+
+
+def parse_text(result_raw):
+    if not result_raw.strip():
+        raise ValueError("resposta vazia")
+    return result_raw
+
+
+def parse_final_score(result_raw):
+    pattern = r"(?i)Pontuação Final[:\s]*([\d,.]+(?:/\d{1,2})?)"
+    match = re.search(pattern, result_raw)
+    if not match:
+        raise ValueError("Pontuação Final não encontrada na resposta.")
+    re_match = match.group(1)
+    if '/' in re_match:
+        re_match = re_match.split('/')[0]
+    return float(re_match.replace(',', '.'))
+
+
+def parse_evaluation(result_raw, job):
+    data = json.loads(result_raw)
+    if not isinstance(data, dict):
+        raise ValueError("A avaliação deve ser um objeto JSON.")
+    return {
+        'score': validate_number(data.get('pontuacao_final'), 0, 10, 'pontuacao_final'),
+        'score_competence': validate_scores(data.get('competencias'), job.get('competence') or [], 'competencias'),
+        'score_strategies': validate_scores(data.get('estrategias'), job.get('strategies') or [], 'estrategias'),
+        'score_qualifications': validate_scores(data.get('qualificacoes'), job.get('qualifications') or [], 'qualificacoes'),
+    }
+
+
+def parse_score_matrix(result_raw, candidates, categories):
+    data = json.loads(result_raw)
+    rows = data.get('candidatos') if isinstance(data, dict) else None
+    if not isinstance(rows, list) or len(rows) != candidates:
+        raise ValueError(f"'candidatos' deve conter {candidates} listas de notas.")
+    return [validate_scores(row, categories, f'candidato {index}') for index, row in enumerate(rows, 1)]
+
+
+def validate_scores(values, categories, field):
+    if not isinstance(values, list) or len(values) != len(categories):
+        raise ValueError(f"'{field}' deve conter {len(categories)} notas.")
+    return [validate_number(value, 1, 5, field) for value in values]
+
+
+def validate_number(value, minimum, maximum, field):
+    try:
+        number = float(str(value).replace(',', '.'))
+    except ValueError:
+        raise ValueError(f"'{field}' contém um valor não numérico: {value}")
+    if not minimum <= number <= maximum:
+        raise ValueError(f"'{field}' fora do intervalo {minimum}-{maximum}: {number}")
+    return number
@@ -0,0 +1,59 @@
+import os
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+
+import httpx
+
+
+# Falhas de transporte: repete o mesmo prompt, sem pedido de correção
+TRANSIENT_ERRORS = (httpx.HTTPError, ConnectionError, TimeoutError)
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    max_attempts: int = int(os.getenv('LLM_MAX_ATTEMPTS', '3'))
+    base_delay: float = float(os.getenv('LLM_RETRY_BASE_DELAY', '1.0'))
+    max_delay: float = float(os.getenv('LLM_RETRY_MAX_DELAY', '20.0'))
+    factor: float = 2.0
+
+    def delay(self, attempt):
+        return min(self.max_delay, self.base_delay * self.factor ** (attempt - 1))
+
+
+class RetryExhausted(Exception):
+    def __init__(self, method, attempts, last_error):
+        self.method = method
+        self.attempts = attempts
+        self.last_error = last_error
+        super().__init__(f"{method} falhou após {attempts} tentativas: {last_error}")
+
+
+class RetryStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = defaultdict(int)
+        self._retries = defaultdict(int)
+        self._exhausted = defaultdict(int)
+
+    def record(self, method, attempts, exhausted=False):
+        with self._lock:
+            self._calls[method] += 1
+            self._retries[method] += attempts - 1
+            if exhausted:
+                self._exhausted[method] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                method: {
+                    'calls': self._calls[method],
+                    'retries': self._retries[method],
+                    'exhausted': self._exhausted[method],
+                }
+                for method in self._calls
+            }
+
+
+DEFAULT_POLICY = RetryPolicy()
+RETRY_STATS = RetryStats()
@@ -1,6 +1,7 @@
-import gspread, googleapiclient, uuid
+import gspread, googleapiclient
 from oauth2client.service_account import ServiceAccountCredentials
 from googleapiclient.discovery import build
+from service.stored_files import StoredFile
 
 
 SCOPE = ['https://www.googleapis.com/auth/spreadsheets', 'https://www.googleapis.com/auth/drive']
@@ -26,8 +27,7 @@ class AccessResume:
 
     def download_file(self, file_id):
         request = CLIENT_DRIVE.files().get_media(fileId=file_id)
-        full_path = f'storage/{str(uuid.uuid4())}'
-        with open(full_path, "wb") as file:
+        with StoredFile('storage') as file:
             downloader = googleapiclient.http.MediaIoBaseDownload(file, request)
             done = False
             max_chunks = 100  # limite máximo de iterações
@@ -37,7 +37,7 @@ class AccessResume:
                 chunk_count += 1
             if not done:
                 raise Exception("Download não completou após o número máximo de chunks.")
-        return full_path
+        return str(file.path)
 
 
     def check_file_access(file_id):
@@ -0,0 +1,87 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """
+    Junta chamadas simultâneas com a mesma chave: a primeira executa e as
+    demais esperam e recebem o mesmo resultado (ou a mesma exceção). A
+    chave sai da tabela assim que a chamada termina, então não é um cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """Devolve (resultado, compartilhado)."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result(), True
+
+        try:
+            result = fn()
+        except BaseException as err:
+            future.set_exception(err)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+
+class AsyncSingleFlight:
+    """
+    Versão asyncio do SingleFlight. A tabela guarda Futures de
+    concurrent.futures, que qualquer event loop aguarda com
+    asyncio.wrap_future: chamadas de sessões asyncio.run diferentes (uma
+    por thread do Streamlit) também são juntadas.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    async def do(self, key, fn):
+        """Devolve (resultado, compartilhado)."""
+        while True:
+            with self._lock:
+                future = self._calls.get(key)
+                leader = future is None
+                if leader:
+                    future = self._calls[key] = Future()
+            if leader:
+                break
+            # asyncio.wait não cancela o Future compartilhado se quem espera for cancelado
+            await asyncio.wait([asyncio.wrap_future(future)])
+            if not future.cancelled():
+                return future.result(), True
+            # A chamada principal foi cancelada: a próxima da fila assume
+
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as err:
+            future.set_exception(err)
+            raise
+        else:
+            future.set_result(result)
+            return result, False
+        finally:
+            with self._lock:
+                if self._calls.get(key) is future:
+                    del self._calls[key]
+
+
+# Compartilhados por todas as instâncias dos clientes no processo
+INFLIGHT = SingleFlight()
+ASYNC_INFLIGHT = AsyncSingleFlight()
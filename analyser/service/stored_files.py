@@ -0,0 +1,75 @@
+import hashlib
+import os
+import uuid
+from pathlib import Path
+
+
+# Layout dos PDFs em disco e nomes do texto extraído ao lado deles. Não depende
+# do PyMuPDF nem do pool de extração: o banco e o reconcile também usam.
+STORAGE_CHUNK = 1024 * 1024
+HEX_DIGITS = set('0123456789abcdef')
+
+
+class StoredFile:
+    """
+    Grava um arquivo em storage/<2 primeiros>/<sha256> calculando o hash
+    enquanto os bytes chegam. O mesmo PDF enviado de novo cai no mesmo
+    caminho e a cópia temporária é descartada. Serve de destino para o
+    MediaIoBaseDownload do Drive, que só precisa de write().
+    """
+
+    def __init__(self, destination_folder):
+        self.folder = Path(destination_folder)
+        self.folder.mkdir(parents=True, exist_ok=True)
+        self.path = None
+        self._temporary = self.folder / f'.{uuid.uuid4()}.tmp'
+        self._file = open(self._temporary, 'wb')
+        self._hash = hashlib.sha256()
+
+    def write(self, data):
+        self._hash.update(data)
+        return self._file.write(data)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._file.close()
+        if exc_type is not None:
+            self._temporary.unlink(missing_ok=True)
+            return False
+        digest = self._hash.hexdigest()
+        self.path = self.folder / digest[:2] / digest
+        if self.path.exists():
+            self._temporary.unlink()
+        else:
+            self.path.parent.mkdir(exist_ok=True)
+            os.replace(self._temporary, self.path)
+        return False
+
+
+def file_hash(path):
+    """sha256 do arquivo; no layout por conteúdo ele já é o nome."""
+    name = Path(path).name
+    if len(name) == 64 and set(name) <= HEX_DIGITS:
+        return name
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(STORAGE_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def extraction_cache_path(path, version):
+    """
+    Único lugar que monta o nome do texto extraído: <sha256 do conteúdo>.<versão>.json
+    ao lado do PDF, também para os PDFs antigos gravados com nome uuid.
+    Com version='*' vira o padrão que casa com todas as versões.
+    """
+    return Path(path).parent / f'{file_hash(path)}.{version}.json'
+
+
+def extraction_cache_files(path):
+    """Textos extraídos do arquivo guardados em disco, de qualquer versão do extrator."""
+    pattern = extraction_cache_path(path, '*')
+    return list(pattern.parent.glob(pattern.name))
@@ -0,0 +1,151 @@
+import os
+import re
+import unicodedata
+from collections import Counter
+from dataclasses import dataclass
+
+
+CV_TOKEN_BUDGET = int(os.getenv('CV_TOKEN_BUDGET', '3000'))
+CHARS_PER_TOKEN = 4
+# O extrator separa as páginas com \f; cabeçalho/rodapé = primeiras/últimas linhas da página
+PAGE_BREAK = '\f'
+PAGE_EDGE_LINES = 2
+
+# Ordem de preservação quando o currículo passa do orçamento de tokens:
+# o cabeçalho (nome e contato) vem antes da primeira seção reconhecida.
+HEADER = 'cabecalho'
+SECTION_KEYWORDS = {
+    'experiencia': ('experiência', 'experiencia', 'experience', 'histórico profissional', 'atuação profissional'),
+    'habilidades': ('habilidades', 'competências', 'competencias', 'skills', 'conhecimentos', 'ferramentas', 'tecnologias'),
+    'educacao': ('educação', 'educacao', 'formação', 'formacao', 'education', 'escolaridade'),
+    'idiomas': ('idiomas', 'languages', 'línguas'),
+    'certificacoes': ('certificações', 'certificacoes', 'certificados', 'cursos', 'certifications'),
+}
+SECTION_PRIORITY = [HEADER, 'experiencia', 'habilidades', 'educacao', 'idiomas', 'certificacoes']
+
+BOILERPLATE_PATTERNS = [
+    re.compile(r'^(página|pagina|page|pág\.?)\s*\d+(\s*(de|of|/)\s*\d+)?$', re.IGNORECASE),
+    re.compile(r'^\d+\s*(/|de|of)\s*\d+$', re.IGNORECASE),
+    re.compile(r'^\d{1,3}$'),
+    re.compile(r'^(curriculum vitae|currículo|curriculo|resume|cv)$', re.IGNORECASE),
+    re.compile(r'^[\W_]+$'),
+]
+
+
+def estimate_tokens(text):
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+@dataclass
+class PreprocessedCV:
+    text: str
+    original_tokens: int
+    tokens: int
+
+    @property
+    def saved_tokens(self):
+        return self.original_tokens - self.tokens
+
+
+class CVPreprocessor:
+    """
+    Limpa o texto extraído do PDF antes de ir para os prompts: normaliza
+    espaços, remove cabeçalhos/rodapés repetidos entre páginas e boilerplate e,
+    se ainda passar do orçamento, corta por seção mantendo primeiro
+    Experiência e Habilidades.
+    """
+
+    def __init__(self, token_budget=CV_TOKEN_BUDGET):
+        self.token_budget = token_budget
+
+    def process(self, raw_text):
+        lines = self._clean_lines(raw_text)
+        text = self._truncate('\n'.join(lines)) if self.token_budget else '\n'.join(lines)
+        return PreprocessedCV(text=text, original_tokens=estimate_tokens(raw_text), tokens=estimate_tokens(text))
+
+    def _clean_lines(self, raw_text):
+        text = unicodedata.normalize('NFKC', raw_text)
+        pages = [self._page_lines(page) for page in text.split(PAGE_BREAK)]
+        headers = self._repeated(page[:PAGE_EDGE_LINES] for page in pages)
+        footers = self._repeated(page[-PAGE_EDGE_LINES:] for page in pages)
+        lines = []
+        for page in pages:
+            footer_start = len(page) - PAGE_EDGE_LINES
+            for index, line in enumerate(page):
+                # A mesma linha no corpo (um cargo, uma tecnologia) é conteúdo e fica
+                key = line.lower()
+                if (index < PAGE_EDGE_LINES and key in headers) or (index >= footer_start and key in footers):
+                    continue
+                lines.append(line)
+        return lines
+
+    def _page_lines(self, page):
+        lines = []
+        for line in page.splitlines():
+            line = re.sub(r'\s+', ' ', line).strip()
+            if line and not any(pattern.match(line) for pattern in BOILERPLATE_PATTERNS):
+                lines.append(line)
+        return lines
+
+    def _repeated(self, edges):
+        """Linhas presentes na mesma borda (topo ou pé) de mais de uma página."""
+        counts = Counter()
+        for lines in edges:
+            counts.update({line.lower() for line in lines})
+        return {key for key, count in counts.items() if count > 1}
+
+    def _section_of(self, line):
+        if len(line) > 40:
+            return None
+        normalized = line.lower().strip(' :#*-')
+        for section, keywords in SECTION_KEYWORDS.items():
+            if any(normalized.startswith(keyword) for keyword in keywords):
+                return section
+        return None
+
+    def _split_sections(self, text):
+        sections = [(HEADER, [])]
+        for line in text.split('\n'):
+            section = self._section_of(line)
+            if section:
+                sections.append((section, [line]))
+            else:
+                sections[-1][1].append(line)
+        return [(name, '\n'.join(lines)) for name, lines in sections if lines]
+
+    def _truncate(self, text):
+        if estimate_tokens(text) <= self.token_budget:
+            return text
+
+        sections = self._split_sections(text)
+
+        def priority(item):
+            index, (name, _) = item
+            rank = SECTION_PRIORITY.index(name) if name in SECTION_PRIORITY else len(SECTION_PRIORITY)
+            return (rank, index)
+
+        remaining = self.token_budget
+        kept = {}
+        for index, (name, content) in sorted(enumerate(sections), key=priority):
+            if remaining <= 0:
+                break
+            cost = estimate_tokens(content) + 1
+            if cost <= remaining:
+                kept[index] = content
+                remaining -= cost
+            else:
+                kept[index] = self._cut_lines(content, remaining)
+                remaining = 0
+
+        return '\n'.join(kept[index] for index in sorted(kept) if kept[index])
+
+    def _cut_lines(self, content, budget):
+        lines = []
+        used = 0
+        for line in content.split('\n'):
+            cost = estimate_tokens(line) + 1
+            if used + cost > budget:
+                break
+            lines.append(line)
+            used += cost
+        return '\n'.join(lines)
@@ -0,0 +1,45 @@
+import hashlib
+from database.tiny_db import AnalyserDatabase
+from factories.resume_factory import ResumFactory
+from models.analysis import Analysis
+from routes.curriculum import CurriculumRoute
+
+
+def _route(tmp_path):
+    route = CurriculumRoute.__new__(CurriculumRoute)
+    route.database = AnalyserDatabase(str(tmp_path / 'db.json'), blob_path=str(tmp_path / 'blobs'))
+    return route
+
+
+def _stored_pdf(tmp_path):
+    digest = hashlib.sha256(b'pdf').hexdigest()
+    path = tmp_path / digest
+    path.write_bytes(b'pdf')
+    return str(path), digest
+
+
+def _resum(path, digest, **fields):
+    return ResumFactory(
+        job_id='job', content=fields.pop('content', ''), file=path, opnion='',
+        competence=[], strategies=[], qualifications=[], file_hash=digest, **fields,
+    ).build()
+
+
+def test_resum_skipped_by_prescreen_is_evaluated_again(tmp_path):
+    route = _route(tmp_path)
+    path, digest = _stored_pdf(tmp_path)
+    skipped = _resum(path, digest, prescreen_score=0.1)
+    route.database.persist(resums=[skipped])
+
+    assert route.deduplicate([path], {'id': 'job'}) == [path]
+    assert route.known_resums == []
+
+    evaluated = _resum(path, digest, content='## Nome Completo\nAna', score=7.0)
+    analysis = Analysis(id='a', job_id='job', resum_id=evaluated.id, name='Ana', skills=['Python'],
+                        education=['USP'], languages=[], score=7.0)
+    replaced = route.replaced_resums[path]
+    route.database.persist(resums=[evaluated], analyses=[analysis], replaced=replaced)
+
+    assert [resum['id'] for resum in route.database.get_resums_by_file_hash(digest)] == [evaluated.id]
+    assert route.deduplicate([path], {'id': 'job'}) == []
+    assert [resum['id'] for resum in route.known_resums] == [evaluated.id]
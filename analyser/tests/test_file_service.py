@@ -0,0 +1,84 @@
+import asyncio
+import os
+import threading
+import time
+import service.file_service as file_service
+from database.base import remove_stored_files
+from service.file_service import Extraction, FileService
+from service.stored_files import extraction_cache_files
+
+
+def fake_extract(path):
+    # Roda nos workers do pool: 'hang' simula uma página que nunca termina, 'crash' um worker que morre
+    if 'crash' in path:
+        os._exit(1)
+    time.sleep(60 if 'hang' in path else 0.1)
+    return Extraction(path=path, text='ok', pages=1, total_pages=1, seconds=0.1)
+
+
+def _patch(monkeypatch):
+    monkeypatch.setattr(file_service, 'EXTRACT_KILL_TIMEOUT', 1.5)
+    monkeypatch.setattr(file_service, 'EXTRACT_WORKERS', 2)
+    monkeypatch.setattr(file_service, 'extract_text', fake_extract)
+    monkeypatch.setattr(file_service, 'cached_extraction', lambda path, *args: None)
+
+
+FILES = ['hang-1', 'a', 'b', 'hang-2', 'c']
+EXPECTED = [('a', False), ('b', False), ('c', False), ('hang-1', True), ('hang-2', True)]
+
+
+def test_stuck_extraction_is_killed_and_the_rest_finishes(monkeypatch):
+    _patch(monkeypatch)
+    started = time.monotonic()
+    results = list(FileService().extract_all(FILES))
+    assert sorted((path, extraction.timed_out) for path, extraction in results) == EXPECTED
+    assert time.monotonic() - started < 20
+
+
+def test_stuck_extraction_is_killed_in_the_async_stream(monkeypatch):
+    _patch(monkeypatch)
+
+    async def collect():
+        return [item async for item in FileService().extract_all_async(FILES)]
+
+    results = asyncio.run(collect())
+    assert sorted((path, extraction.timed_out) for path, extraction in results) == EXPECTED
+
+
+def test_stuck_extraction_does_not_break_a_concurrent_batch(monkeypatch):
+    """Duas sessões do Streamlit extraindo ao mesmo tempo."""
+    _patch(monkeypatch)
+    results = {}
+
+    def session(name, files):
+        results[name] = sorted((path, extraction.timed_out, extraction.error) for path, extraction in FileService().extract_all(files))
+
+    threads = [
+        threading.Thread(target=session, args=('travada', ['hang-1', 'a', 'b'])),
+        threading.Thread(target=session, args=('normal', ['c', 'd', 'e', 'f', 'g', 'h'])),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+
+    assert results['normal'] == [(path, False, None) for path in 'cdefgh']
+    assert [(path, timed_out) for path, timed_out, _ in results['travada']] == [('a', False), ('b', False), ('hang-1', True)]
+
+
+def test_files_lost_with_a_crashed_worker_are_retried(monkeypatch):
+    _patch(monkeypatch)
+    results = sorted((path, bool(extraction.error)) for path, extraction in FileService().extract_all(['a', 'crash', 'b', 'c']))
+    assert results == [('a', False), ('b', False), ('c', False), ('crash', True)]
+
+
+def test_removing_a_legacy_file_also_removes_its_extraction(tmp_path):
+    """PDFs antigos têm nome uuid, mas o texto extraído é gravado pelo sha256 do conteúdo."""
+    legacy = tmp_path / '3f1c2a9e-legacy.pdf'
+    legacy.write_bytes(b'%PDF-1.4 legado')
+    extraction = Extraction(path=str(legacy), text='texto', pages=1, total_pages=1, seconds=0.1)
+    file_service._store_extraction(legacy, extraction, 30)
+    assert len(extraction_cache_files(legacy)) == 1
+
+    assert remove_stored_files([str(legacy)]) == 1
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,25 @@
+import json
+from database.job_stats import add_analyses, empty_stats, summarize
+
+
+def test_stats_record_does_not_grow_with_analyses():
+    stats = empty_stats('job')
+    sizes = {}
+    for index in range(500):
+        stats = add_analyses(stats, [{'score': index % 101 / 10, 'name': str(index), 'skills': ['python']}])
+        sizes[index + 1] = len(json.dumps(stats))
+    # Só os dígitos das contagens mudam
+    assert sizes[500] - sizes[50] < 200
+    summary = summarize(stats)
+    scores = sorted(index % 101 / 10 for index in range(500))
+    assert summary['p50'] == scores[250]
+    assert summary['p90'] == scores[450]
+    assert (summary['min'], summary['max']) == (0.0, 10.0)
+    assert sum(summary['histogram'].values()) == 500
+
+
+def test_percentiles_at_the_top_of_the_scale():
+    scores = [9.9] * 5 + [10.0] * 5
+    summary = summarize(add_analyses(empty_stats('job'), [{'score': score} for score in scores]))
+    assert (summary['p50'], summary['p90'], summary['max']) == (10.0, 10.0, 10.0)
+    assert summary['histogram']['9-10'] == 10
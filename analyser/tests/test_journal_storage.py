@@ -0,0 +1,47 @@
+import multiprocessing
+from database.journal_storage import JournalStorage
+from database.tiny_db import AnalyserDatabase
+
+
+def open_journal(path, tmp_path):
+    return AnalyserDatabase(str(path), storage=JournalStorage, blob_path=str(tmp_path / 'blobs'))
+
+
+def test_insert_after_external_append_does_not_reuse_doc_id(tmp_path):
+    path = tmp_path / 'db.journal'
+    app = open_journal(path, tmp_path)
+    cron = open_journal(path, tmp_path)
+
+    app.files.insert({'file_id': '1', 'job_id': 'job'})
+    cron.files.insert({'file_id': '2', 'job_id': 'job'})
+    app.files.insert({'file_id': '3', 'job_id': 'job'})
+
+    reader = open_journal(path, tmp_path)
+    assert sorted(file['file_id'] for file in reader.files.all()) == ['1', '2', '3']
+
+
+def _insert_many(path, blob_path, prefix, count):
+    database = AnalyserDatabase(path, storage=JournalStorage, blob_path=blob_path)
+    for index in range(count):
+        database.files.insert({'file_id': f'{prefix}{index}', 'job_id': 'job'})
+    database.storage.close()
+
+
+def test_concurrent_processes_and_compaction_keep_every_record(tmp_path):
+    path = str(tmp_path / 'db.journal')
+    blob_path = str(tmp_path / 'blobs')
+    app = open_journal(path, tmp_path)
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=_insert_many, args=(path, blob_path, prefix, 60)) for prefix in 'ab']
+    for worker in workers:
+        worker.start()
+    while any(worker.is_alive() for worker in workers):
+        app.compact()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    reader = open_journal(path, tmp_path)
+    file_ids = [file['file_id'] for file in reader.files.all()]
+    assert len(file_ids) == 120
+    assert len(set(file_ids)) == 120
@@ -0,0 +1,12 @@
+from service.llm_metrics import LLMMetrics, Usage
+
+
+def test_record_does_not_write_the_file_until_flush(tmp_path):
+    path = tmp_path / 'llm.prom'
+    metrics = LLMMetrics(path=str(path), write_interval=3600)
+    for _ in range(3):
+        metrics.record('resume_cv', 'llama3', Usage(prompt_tokens=10, completion_tokens=5), 0.5, 0)
+    assert not path.exists()
+
+    metrics.flush()
+    assert 'llm_calls_total{method="resume_cv",model="llama3"} 3' in path.read_text(encoding='utf-8')
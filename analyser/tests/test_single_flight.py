@@ -0,0 +1,56 @@
+import asyncio
+import threading
+from service.single_flight import AsyncSingleFlight
+
+
+def test_calls_from_different_event_loops_are_coalesced():
+    """Cada thread do Streamlit roda seu próprio asyncio.run."""
+    flight = AsyncSingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+    results = []
+
+    async def generate():
+        calls.append(1)
+        started.set()
+        while not release.is_set():
+            await asyncio.sleep(0.01)
+        return 'resposta'
+
+    def session():
+        results.append(asyncio.run(flight.do('chave', generate)))
+
+    leader = threading.Thread(target=session)
+    leader.start()
+    started.wait(5)
+    follower = threading.Thread(target=session)
+    follower.start()
+    # A chamada principal só termina depois que o seguidor já está esperando
+    threading.Timer(0.2, release.set).start()
+    leader.join(5)
+    follower.join(5)
+
+    assert len(calls) == 1
+    assert sorted(results) == [('resposta', False), ('resposta', True)]
+
+
+def test_cancelled_leader_hands_over_to_waiting_call():
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return len(calls)
+
+    async def main():
+        leader = asyncio.create_task(flight.do('chave', generate))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(flight.do('chave', generate))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(main()) == (2, False)
+    assert flight._calls == {}
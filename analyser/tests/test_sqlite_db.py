@@ -0,0 +1,82 @@
+import hashlib
+from database.sqlite_db import SQLiteAnalyserDatabase
+from database.tiny_db import AnalyserDatabase
+from factories.resume_factory import ResumFactory
+from models.analysis import Analysis
+from models.file import File
+
+
+def _open(tmp_path, json_path=None):
+    return SQLiteAnalyserDatabase(str(tmp_path / 'db.sqlite3'), json_path=json_path, blob_path=str(tmp_path / 'blobs'))
+
+
+def _resum(job_id, path, digest):
+    return ResumFactory(
+        job_id=job_id, content='', file=path, opnion='', competence=[], strategies=[],
+        qualifications=[], file_hash=digest,
+    ).build()
+
+
+def _analysis(resum, score):
+    return Analysis(id=f'a-{resum.id}', job_id=resum.job_id, resum_id=resum.id, name='Ana',
+                    skills=['Python'], education=[], languages=[], score=score)
+
+
+def test_json_is_migrated_once_keeping_the_order(tmp_path):
+    json_path = tmp_path / 'db.json'
+    tiny = AnalyserDatabase(str(json_path), blob_path=str(tmp_path / 'blobs'))
+    tiny.jobs.insert({'id': 'job', 'name': 'Dev', 'sheet_name': 'dev'})
+    tiny.persist(files=[File(file_id=str(index), job_id='job') for index in range(12)])
+    tiny.close()
+
+    database = _open(tmp_path, str(json_path))
+    assert database.get_job_by_name('Dev')['id'] == 'job'
+    # doc_id '10' vem depois de '9', não entre '1' e '2'
+    assert [file['file_id'] for file in database.files.all()] == [str(index) for index in range(12)]
+    database.close()
+
+    json_path.write_text('{"files": {"1": {"file_id": "novo", "job_id": "job"}}}')
+    database = _open(tmp_path, str(json_path))
+    assert len(database.files) == 12
+    assert database.get_last_file_by_job_id('job')['file_id'] == '11'
+
+
+def test_lookups_use_the_field_indexes(tmp_path):
+    database = _open(tmp_path)
+    database.files.insert_multiple([{'file_id': str(index), 'job_id': f'job-{index % 3}'} for index in range(9)])
+
+    assert [file['file_id'] for file in database.files.search_by('job_id', 'job-1')] == ['1', '4', '7']
+    assert database.files.get_by('job_id', 'job-1')['file_id'] == '1'
+    assert database.files.get_by('job_id', 'job-1', last=True)['file_id'] == '7'
+    assert database.files.get_by('job_id', 'outra') is None
+
+    indexes = {name for name, in database._connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert {'idx_resums_file_hash', 'idx_analysis_resum_id', 'idx_files_job_id'} <= indexes
+    plan = database._connection.execute(
+        "EXPLAIN QUERY PLAN SELECT data FROM files WHERE json_extract(data, '$.job_id') = ?", ('job-1',)
+    ).fetchall()
+    assert any('idx_files_job_id' in row[-1] for row in plan)
+
+
+def test_cascade_delete_keeps_pdfs_shared_with_another_job(tmp_path):
+    database = _open(tmp_path)
+    path = tmp_path / 'curriculo.pdf'
+    path.write_bytes(b'pdf')
+    digest = hashlib.sha256(b'pdf').hexdigest()
+    first, second = _resum('first', str(path), digest), _resum('second', str(path), digest)
+    for job_id in ('first', 'second'):
+        database.jobs.insert({'id': job_id, 'name': job_id, 'sheet_name': job_id})
+    database.persist(resums=[first, second], analyses=[_analysis(first, 6.0), _analysis(second, 8.0)],
+                     files=[File(file_id='1', job_id='first'), File(file_id='2', job_id='second')])
+    assert database.get_job_stats('first')['count'] == 1
+
+    removed = database.delete_job_cascade('first')
+    assert removed == {'resums': 1, 'analysis': 1, 'files': 1, 'jobs': 1, 'pdfs': 0}
+    assert path.exists()
+    assert database.job_stats.get_by('job_id', 'first') is None
+    assert database.get_job_stats('second')['count'] == 1
+
+    removed = database.delete_job_cascade('second', keep_job=True)
+    assert removed == {'resums': 1, 'analysis': 1, 'files': 1, 'jobs': 0, 'pdfs': 1}
+    assert not path.exists()
+    assert [job['id'] for job in database.jobs.all()] == ['second']
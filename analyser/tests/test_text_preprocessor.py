@@ -0,0 +1,20 @@
+from service.text_preprocessor import CVPreprocessor
+
+
+def test_only_headers_and_footers_repeated_across_pages_are_removed():
+    pages = [
+        'Ana Souza - ana@mail.com\nExperiência\nDesenvolvedora Python\nEmpresa A\nPython\nDjango\nConfidencial',
+        'Ana Souza - ana@mail.com\nDesenvolvedora Python\nEmpresa B\nPython\nFastAPI\nSQL\nConfidencial',
+    ]
+    lines = CVPreprocessor(token_budget=0).process('\f'.join(pages)).text.split('\n')
+
+    assert 'Ana Souza - ana@mail.com' not in lines
+    assert 'Confidencial' not in lines
+    # Repetidas no corpo ou em bordas diferentes: são conteúdo
+    assert lines.count('Python') == 2
+    assert lines.count('Desenvolvedora Python') == 2
+
+
+def test_single_page_keeps_repeated_lines():
+    text = 'Ana Souza\nEmpresa A\nPython\nEmpresa B\nPython\nAna Souza'
+    assert CVPreprocessor(token_budget=0).process(text).text == text
@@ -0,0 +1,29 @@
+from database.tiny_db import AnalyserDatabase
+from models.file import File
+
+
+def test_insert_after_external_write_does_not_reuse_doc_id(tmp_path):
+    """Duas instâncias no mesmo db.json (app e cron): nenhuma sobrescreve a linha da outra."""
+    path = tmp_path / 'db.json'
+    app = AnalyserDatabase(str(path), blob_path=str(tmp_path / 'blobs'))
+    cron = AnalyserDatabase(str(path), blob_path=str(tmp_path / 'blobs'))
+
+    app.persist(files=[File(file_id='1', job_id='job')])
+    cron.persist(files=[File(file_id='2', job_id='job')])
+    app.persist(files=[File(file_id='3', job_id='job')])
+
+    reader = AnalyserDatabase(str(path), blob_path=str(tmp_path / 'blobs'))
+    assert sorted(file['file_id'] for file in reader.files.all()) == ['1', '2', '3']
+    assert app.get_last_file_by_job_id('job')['file_id'] == '3'
+
+
+def test_plain_insert_after_external_write_does_not_reuse_doc_id(tmp_path):
+    path = tmp_path / 'db.json'
+    app = AnalyserDatabase(str(path), blob_path=str(tmp_path / 'blobs'))
+    cron = AnalyserDatabase(str(path), blob_path=str(tmp_path / 'blobs'))
+
+    app.files.insert({'file_id': '1', 'job_id': 'job'})
+    cron.files.insert({'file_id': '2', 'job_id': 'job'})
+    app.files.insert({'file_id': '3', 'job_id': 'job'})
+
+    assert sorted(file['file_id'] for file in cron.files.all()) == ['1', '2', '3']